@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
@@ -13,14 +15,85 @@ class Settings(BaseSettings):
     mail_from: str
     mail_port: int
     mail_server: str
+    smtp_pool_size: int = 4
+    birthday_digest_days: int = 7
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 2
+    redis_socket_timeout: float = 1
+    redis_socket_connect_timeout: float = 1
+    redis_health_check_interval: int = 30
+    redis_retries: int = 2
+    redis_command_timeout: float = 0.25
+    redis_breaker_failures: int = 5
+    redis_breaker_reset_seconds: float = 5
     cloudinary_name: str
     cloudinary_api_key: str
     cloudinary_api_secret: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    shutdown_drain_timeout: float = 10
+    coalesce_wait_timeout: float = 5
+    sync_settle_seconds: float = 1
+    events_heartbeat_seconds: float = 15
+    events_max_queued: int = 100
+    idempotency_ttl: int = 86400
+    idempotency_lock_seconds: int = 60
+    idempotency_wait_timeout: float = 10
+    account_purge_batch_size: int = 1000
+    account_purge_pause: float = 0.05
+    account_purge_stale_seconds: float = 300
+    admission_enabled: bool = True
+    # Bulkhead limits apply per worker process: with N workers a group runs up to
+    # N times ``_concurrency`` requests. Uploads are kept small because each holds
+    # the file in memory during a slow Cloudinary call; 2 running and 4 queued per
+    # worker means anything beyond 6 concurrent uploads per worker is shed with 503.
+    admission_auth_concurrency: int = 4
+    admission_auth_queue: int = 16
+    admission_auth_timeout: float = 2
+    admission_contact_reads_concurrency: int = 32
+    admission_contact_reads_queue: int = 64
+    admission_contact_reads_timeout: float = 1
+    admission_contact_writes_concurrency: int = 16
+    admission_contact_writes_queue: int = 32
+    admission_contact_writes_timeout: float = 2
+    admission_uploads_concurrency: int = 2
+    admission_uploads_queue: int = 4
+    admission_uploads_timeout: float = 5
+    loop_lag_interval: float = 0.5
+    loop_debug: bool = False
+    loop_block_threshold: float = 0.1
+    sql_debug: bool = False
+    sql_slow_query_ms: float = 200
+    sql_n_plus_one_threshold: int = 5
+    profiling_enabled: bool = False
+    profiling_token: str = ''
+    profiling_dir: str = 'profiles'
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
-settings = Settings()
\ No newline at end of file
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Returns the application settings, reading the environment on first use.
+
+    Settings are not loaded at import time, so modules can be imported (by tests,
+    scripts or a pre-forking server) without the full environment being present.
+
+    :return: The application settings.
+    :rtype: Settings
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    # ``from contacts_api.conf.config import settings`` keeps working, loading lazily.
+    if name == 'settings':
+        return get_settings()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
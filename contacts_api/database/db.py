@@ -1,16 +1,136 @@
+import functools
+import inspect
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from contacts_api.conf.config import settings
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from contacts_api.conf.config import get_settings
+from contacts_api.database import instrumentation
+
+_engine: Engine | None = None
+
+
+
+class ReleasingSession(Session):
+    """
+    Session that can hand its connection back to the pool between statements.
+
+    A session checks a connection out on its first statement and keeps it until
+    the transaction ends. Reads never commit, so without :meth:`release` the
+    connection stays checked out until the request finishes, through response
+    serialization and everything else the request does afterwards. Objects are
+    not expired on commit, so loaded results stay usable without going back to
+    the database.
+    """
+
+    def release(self) -> None:
+        """
+        Ends the current transaction if it has nothing to write, returning the
+        connection to the pool; the next statement checks one out again.
+        """
+        if self.in_transaction() and not (self.new or self.dirty or self.deleted):
+            self.commit()
+
+
+SessionLocal = sessionmaker(class_=ReleasingSession, autocommit=False, autoflush=False, expire_on_commit=False)
+
+
+def get_engine() -> Engine:
+    """
+    Returns the application's engine, creating and instrumenting it on first use.
+
+    No connection is opened here; the pool connects when a session first needs it.
+
+    :return: The application's engine.
+    :rtype: Engine
+    """
+    global _engine
+    if _engine is None:
+        settings = get_settings()
+        if settings.sqlalchemy_database_url.startswith('sqlite'):
+            engine_options = {}
+        else:
+            engine_options = dict(
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,
+                pool_pre_ping=True,
+            )
+        engine = create_engine(settings.sqlalchemy_database_url, **engine_options)
+        instrumentation.install(engine, debug=settings.sql_debug, slow_query_ms=settings.sql_slow_query_ms)
+        instrumentation.track_pool(engine)
+        _engine = engine
+    return _engine
 
-SQL_DB_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQL_DB_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def dispose_engine(close: bool = True) -> None:
+    """
+    Releases the engine's pooled connections, if the engine has been created.
+
+    :param close: Close the connections; pass False in a forked child to only
+        forget the connections inherited from the parent.
+    :type close: bool
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+
+
+def warm_pool() -> None:
+    """
+    Opens the pool's persistent connections up front, so the first requests
+    after a worker starts don't pay for connecting to the database.
+    """
+    engine = get_engine()
+    size = engine.pool.size() if hasattr(engine.pool, 'size') else 1
+    connections = [engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+    instrumentation.report_pool_capacity(engine)
+
+
+def release(db: Session) -> None:
+    """
+    Returns the connection of a :class:`ReleasingSession` to the pool; other
+    sessions are left alone.
+
+    :param db: database session.
+    :type db: Session
+    """
+    if isinstance(db, ReleasingSession):
+        db.release()
+
+
+def releases_connection(func):
+    """
+    Decorates a read function of the repository so that the connection of its
+    ``db`` session goes back to the pool as soon as it returns, instead of when
+    the request ends.
+
+    :param func: ``async`` repository function taking ``db``.
+    :return: decorated function.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        release(signature.bind(*args, **kwargs).arguments['db'])
+        return result
+
+    return wrapper
 
 
 def get_db():
-    db = SessionLocal()
+    """
+    Yields a session for one request.
+
+    The session connects only when it runs its first statement; read functions of
+    the repository release the connection right after their query, and writes
+    release it when they commit.
+    """
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
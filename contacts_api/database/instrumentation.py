@@ -0,0 +1,190 @@
+import logging
+import time
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from contacts_api.services.metrics import (
+    current_request,
+    route_label,
+    RequestStats,
+    DB_QUERY_DURATION,
+    DB_POOL_CHECKED_OUT,
+    DB_CONNECTION_HOLD,
+    DB_POOL_SIZE,
+    DB_POOL_MAX_OVERFLOW,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None:
+            stats.statements[statement] += 1
+    return elapsed
+
+
+def explain(conn, statement: str, parameters) -> str | None:
+    """
+    Returns the query plan of a statement, using the dialect's ``EXPLAIN`` flavour.
+
+    The plan is fetched on a raw DBAPI cursor so it is not itself instrumented.
+
+    :param conn: connection the statement was executed on.
+    :param statement: SQL text as sent to the driver.
+    :type statement: str
+    :param parameters: driver parameters the statement was executed with.
+    :return: plan rows joined by newlines, or None if no plan is available.
+    :rtype: str | None
+    """
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f'plan unavailable: {e}'
+    finally:
+        cursor.close()
+
+
+def install(engine: Engine, debug: bool = False, slow_query_ms: float = 200) -> None:
+    """
+    Registers SQL timing hooks on an engine.
+
+    Statement counts and durations are added to the stats of the request being
+    served, so they can be reported per route by ``MetricsMiddleware``. With
+    ``debug`` enabled, statements slower than ``slow_query_ms`` are logged together
+    with their query plan.
+
+    :param engine: engine to instrument.
+    :type engine: Engine
+    :param debug: log slow statements with their plans.
+    :type debug: bool
+    :param slow_query_ms: slow statement threshold in milliseconds.
+    :type slow_query_ms: float
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    if not debug:
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        return
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = _after_cursor_execute(conn, cursor, statement, parameters, context, executemany)
+        if elapsed * 1000 >= slow_query_ms:
+            plan = None if executemany else explain(conn, statement, parameters)
+            logger.warning('Slow query (%.1f ms): %s\nParameters: %r\nPlan:\n%s',
+                           elapsed * 1000, statement, parameters, plan)
+
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+    connection_record.info['checked_out_at'] = time.perf_counter()
+
+
+def _checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+    checked_out_at = connection_record.info.pop('checked_out_at', None)
+    if checked_out_at is not None:
+        DB_CONNECTION_HOLD.observe(time.perf_counter() - checked_out_at)
+
+
+def track_pool(engine: Engine) -> None:
+    """
+    Counts connections checked out of the engine's pool in a gauge and records
+    how long each one is held before it is returned.
+
+    The count comes from pool events rather than being read from the pool, so the
+    gauge also aggregates across worker processes.
+
+    :param engine: engine whose pool is reported.
+    :type engine: Engine
+    """
+    event.listen(engine.pool, 'checkout', _checkout)
+    event.listen(engine.pool, 'checkin', _checkin)
+
+
+def report_pool_capacity(engine: Engine) -> None:
+    """
+    Publishes the pool size and overflow limit, the denominators of pool saturation.
+
+    Called from the serving process rather than at import time, so a pre-forking
+    master does not report a pool of its own.
+
+    :param engine: engine whose pool is reported.
+    :type engine: Engine
+    """
+    pool = engine.pool
+    DB_POOL_SIZE.set(pool.size() if hasattr(pool, 'size') else 1)
+    DB_POOL_MAX_OVERFLOW.set(getattr(pool, '_max_overflow', 0))
+
+
+class QueryDebugMiddleware:
+    """
+    ASGI middleware collecting every SQL statement executed by a request.
+
+    Adds a ``Server-Timing`` header with the database time and query count, and
+    logs statements repeated at least ``n_plus_one_threshold`` times in one request
+    as probable N+1 queries. Meant to be enabled only while debugging.
+
+    :param n_plus_one_threshold: repetitions of one statement that trigger a warning.
+    :type n_plus_one_threshold: int
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = current_request.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request.set(stats)
+        stats.statements = Counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing',
+                               f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            for statement, count in stats.statements.items():
+                if count >= self.n_plus_one_threshold:
+                    logger.warning('Probable N+1 in %s %s: statement executed %d times: %s',
+                                   scope['method'], route_label(scope), count, statement)
+            stats.statements = None
+            if token is not None:
+                current_request.reset(token)
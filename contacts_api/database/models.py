@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, func
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import DateTime
-from .db import engine
+from .db import get_engine
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -12,12 +15,28 @@ class Contact(Base):
     id = Column(Integer(), autoincrement=True, primary_key=True)
     first_name = Column(String(), nullable=False)
     last_name = Column(String(), nullable=False)
-    email = Column(String(), unique=True, nullable=False)
+    email = Column(String(), nullable=False)
     phone = Column(String(), nullable=False)
     birth_date = Column(Date(), nullable=False)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
     user = relationship('User', backref='contacts')
     additional_info = Column(String(), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'email', name='uq_contacts_user_id_email'),
+        Index('ix_contacts_user_id_updated_at', 'user_id', 'updated_at'),
+    )
+
+class ContactTombstone(Base):
+    __tablename__ = 'contact_tombstones'
+    id = Column(Integer(), autoincrement=True, primary_key=True)
+    contact_id = Column(Integer(), nullable=False)
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index('ix_contact_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),)
 
 class User(Base):
     __tablename__ = 'users'
@@ -29,5 +48,30 @@ class User(Base):
     confirmed = Column(Boolean(), default=False)
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
+    contact_count = Column(Integer(), default=0, server_default='0', nullable=False)
+    disabled = Column(Boolean(), default=False, server_default='0', nullable=False)
+
+class AccountDeletion(Base):
+    __tablename__ = 'account_deletions'
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    # No foreign key: the record outlives the user, so progress stays readable.
+    user_id = Column(Integer(), nullable=False, index=True)
+    status = Column(String(16), default='pending', nullable=False)
+    contacts_total = Column(Integer(), default=0, nullable=False)
+    contacts_deleted = Column(Integer(), default=0, nullable=False)
+    requested_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+def create_schema(engine=None) -> None:
+    """
+    Creates the tables that do not exist yet.
+
+    Schema creation is an explicit step (``python -m contacts_api.scripts.init_db``
+    or Alembic migrations) rather than a side effect of importing the models.
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    :param engine: Engine to create the tables with; the application's engine by default.
+    :type engine: Engine
+    """
+    Base.metadata.create_all(bind=engine or get_engine())
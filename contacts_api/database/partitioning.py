@@ -0,0 +1,265 @@
+"""
+Hash partitioning of the ``contacts`` table by ``user_id`` (PostgreSQL only).
+
+Partitioning is opt-in: its revisions form the ``partitioning`` Alembic branch,
+apart from the ``main`` branch that ``alembic upgrade main@head`` applies, and
+start from the ``main`` revision that created ``account_deletions``. The table is
+moved online in three steps:
+
+1. Alembic revision ``e7b4c9d1a2f3`` creates ``contacts_partitioned`` with the same
+   columns, split into ``CONTACTS_PARTITIONS`` hash partitions, and a trigger that
+   mirrors every write on ``contacts`` into it. It fails when a contact has no
+   ``user_id``, since the partition key cannot be NULL.
+2. ``python -m contacts_api.scripts.partition_contacts`` copies the existing rows in
+   small batches while the application keeps running.
+3. Alembic revision ``f2c8e5a7b9d4`` copies whatever the tool has not copied yet
+   under a short write lock and swaps the tables. The old table is kept as
+   ``contacts_old`` until ``partition_contacts --drop-old``. The revision refuses
+   to run, before taking the lock, while more than ``SWAP_MAX_PENDING`` rows are
+   left to copy, so ``alembic upgrade partitioning@head`` never copies a large
+   table with writes blocked; empty and fully copied tables are swapped right away.
+
+Revisions added to ``main`` later apply to whichever table is called ``contacts``;
+create them with ``alembic revision --head main@head``.
+
+Partitioned tables need the partition key in every unique constraint, so the
+primary key becomes ``(id, user_id)``; ids still come from the original sequence
+and stay unique, so the ORM model and the queries do not change.
+"""
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone', 'birth_date', 'user_id', 'additional_info',
+           'created_at', 'updated_at')
+
+_COLUMN_LIST = ', '.join(COLUMNS)
+_UPDATE_LIST = ', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS if column not in ('id', 'user_id'))
+
+# (old name, name on contacts_partitioned); the canonical names move to the
+# partitioned table when it replaces contacts.
+CONSTRAINTS = (
+    ('contacts_pkey', 'contacts_partitioned_pkey'),
+    ('uq_contacts_user_id_email', 'uq_contacts_partitioned_user_id_email'),
+    ('contacts_user_id_fkey', 'contacts_partitioned_user_id_fkey'),
+)
+INDEXES = (
+    ('ix_contacts_user_id_updated_at', 'ix_contacts_partitioned_user_id_updated_at'),
+    ('ix_contacts_birthday', 'ix_contacts_partitioned_birthday'),
+)
+
+# Rows the swap still copies itself, with writes blocked.
+SWAP_MAX_PENDING = 10_000
+
+
+def create_shadow_table(partitions: int) -> List[str]:
+    """
+    Statements creating the empty partitioned copy of ``contacts``, its mirror
+    trigger and the table recording how far the copy tool got.
+
+    :param partitions: number of hash partitions.
+    :type partitions: int
+    :return: SQL statements, in order.
+    :rtype: List[str]
+    """
+    statements = [
+        check_user_ids(),
+        'CREATE TABLE contacts_partitioned (LIKE contacts INCLUDING DEFAULTS) PARTITION BY HASH (user_id)',
+        'ALTER TABLE contacts_partitioned ALTER COLUMN user_id SET NOT NULL',
+        'ALTER TABLE contacts_partitioned ADD CONSTRAINT contacts_partitioned_pkey PRIMARY KEY (id, user_id)',
+        'ALTER TABLE contacts_partitioned ADD CONSTRAINT uq_contacts_partitioned_user_id_email '
+        'UNIQUE (user_id, email)',
+        'ALTER TABLE contacts_partitioned ADD CONSTRAINT contacts_partitioned_user_id_fkey '
+        'FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE',
+        'CREATE INDEX ix_contacts_partitioned_user_id_updated_at ON contacts_partitioned (user_id, updated_at)',
+        'CREATE INDEX ix_contacts_partitioned_birthday ON contacts_partitioned '
+        '((EXTRACT(month FROM birth_date) * 100 + EXTRACT(day FROM birth_date)), user_id, id)',
+    ]
+    statements += [
+        f'CREATE TABLE contacts_p{remainder} PARTITION OF contacts_partitioned '
+        f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        for remainder in range(partitions)
+    ]
+    statements += [
+        'CREATE TABLE contacts_partition_progress (copied_up_to BIGINT NOT NULL)',
+        'INSERT INTO contacts_partition_progress VALUES (0)',
+    ]
+    return statements + create_mirror_trigger()
+
+
+def create_mirror_trigger() -> List[str]:
+    """
+    Statements installing the trigger that applies every write on ``contacts`` to
+    ``contacts_partitioned``, so rows copied earlier never go stale.
+    """
+    return [
+        f'''CREATE FUNCTION contacts_mirror() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM contacts_partitioned WHERE id = OLD.id AND user_id = OLD.user_id;
+        RETURN OLD;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id THEN
+        DELETE FROM contacts_partitioned WHERE id = OLD.id AND user_id = OLD.user_id;
+    END IF;
+    INSERT INTO contacts_partitioned ({_COLUMN_LIST})
+    VALUES ({', '.join('NEW.' + column for column in COLUMNS)})
+    ON CONFLICT (id, user_id) DO UPDATE SET {_UPDATE_LIST};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql''',
+        'CREATE TRIGGER contacts_mirror AFTER INSERT OR UPDATE OR DELETE ON contacts '
+        'FOR EACH ROW EXECUTE FUNCTION contacts_mirror()',
+    ]
+
+
+def drop_mirror_trigger() -> List[str]:
+    return [
+        'DROP TRIGGER IF EXISTS contacts_mirror ON contacts',
+        'DROP FUNCTION IF EXISTS contacts_mirror()',
+    ]
+
+
+def drop_shadow_table() -> List[str]:
+    """
+    Statements undoing :func:`create_shadow_table`.
+    """
+    return drop_mirror_trigger() + [
+        'DROP TABLE IF EXISTS contacts_partition_progress',
+        'DROP TABLE IF EXISTS contacts_partitioned',
+    ]
+
+
+def copy_batch(conn: Connection, after_id: int, batch_size: int) -> int | None:
+    """
+    Copies the next ``batch_size`` rows with an id above ``after_id`` and records
+    the progress, in the caller's transaction.
+
+    Source rows are locked ``FOR SHARE`` until the transaction ends, so a concurrent
+    update or delete waits and is then mirrored by the trigger; a row deleted
+    while being copied cannot reappear. Rows the trigger already mirrored are
+    left alone.
+
+    :param conn: connection with an open transaction.
+    :type conn: Connection
+    :param after_id: highest id already copied.
+    :type after_id: int
+    :param batch_size: maximum number of rows to copy.
+    :type batch_size: int
+    :return: highest id copied, or None when no rows are left.
+    :rtype: int | None
+    """
+    last_id = conn.execute(text(f'''
+        WITH batch AS (
+            SELECT {_COLUMN_LIST} FROM contacts WHERE id > :after_id ORDER BY id LIMIT :batch_size FOR SHARE
+        ), copied AS (
+            INSERT INTO contacts_partitioned ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM batch
+            ON CONFLICT (id, user_id) DO NOTHING
+        )
+        SELECT max(id) FROM batch
+    '''), {'after_id': after_id, 'batch_size': batch_size}).scalar()
+    if last_id is not None:
+        conn.execute(text('UPDATE contacts_partition_progress SET copied_up_to = :last_id'), {'last_id': last_id})
+    return last_id
+
+
+def check_user_ids() -> str:
+    """
+    Statement failing the transaction when a contact has no ``user_id``. The
+    column is nullable on ``contacts`` but is the partition key, so such rows
+    could be neither mirrored nor copied; they have to be deleted or assigned
+    to a user before partitioning.
+
+    :return: SQL statement.
+    :rtype: str
+    """
+    return '''DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM contacts WHERE user_id IS NULL) THEN
+        RAISE EXCEPTION 'contacts without a user_id cannot be partitioned'
+            USING HINT = 'Delete them or assign them to a user, then upgrade again.';
+    END IF;
+END
+$$'''
+
+
+def check_caught_up(max_pending: int) -> str:
+    """
+    Statement failing the transaction when more than ``max_pending`` rows of
+    ``contacts`` are above the copy tool's progress. Rows written since the
+    shadow table exists are counted too, although the trigger already copied
+    them, so the tool should run right before the swap.
+
+    :param max_pending: rows the swap may copy with writes blocked.
+    :type max_pending: int
+    :return: SQL statement.
+    :rtype: str
+    """
+    return f'''DO $$
+BEGIN
+    IF (SELECT count(*) FROM (
+            SELECT 1 FROM contacts WHERE id > (SELECT copied_up_to FROM contacts_partition_progress)
+            LIMIT {max_pending + 1}) pending) > {max_pending} THEN
+        RAISE EXCEPTION 'more than {max_pending} contacts are not copied to contacts_partitioned yet'
+            USING HINT = 'Run python -m contacts_api.scripts.partition_contacts, then upgrade again.';
+    END IF;
+END
+$$'''
+
+
+def swap(max_pending: int = SWAP_MAX_PENDING) -> List[str]:
+    """
+    Statements copying the rows the tool has not copied yet and putting the
+    partitioned table in place of ``contacts``. Writes are blocked, reads are not,
+    while they run; they fail before blocking anything when the tool is more
+    than ``max_pending`` rows behind.
+
+    :param max_pending: rows the swap may copy with writes blocked.
+    :type max_pending: int
+    :return: SQL statements, in order.
+    :rtype: List[str]
+    """
+    statements = [
+        check_caught_up(max_pending),
+        'LOCK TABLE contacts IN EXCLUSIVE MODE',
+        f'INSERT INTO contacts_partitioned ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM contacts '
+        f'WHERE id > (SELECT copied_up_to FROM contacts_partition_progress) ON CONFLICT (id, user_id) DO NOTHING',
+    ] + drop_mirror_trigger() + [
+        'DROP TABLE contacts_partition_progress',
+        'ALTER TABLE contacts RENAME TO contacts_old',
+    ]
+    statements += [f'ALTER TABLE contacts_old RENAME CONSTRAINT {name} TO {name.replace("contacts", "contacts_old", 1)}'
+                   for name, _ in CONSTRAINTS]
+    statements += [f'ALTER INDEX {name} RENAME TO {name.replace("contacts", "contacts_old", 1)}' for name, _ in INDEXES]
+    statements.append('ALTER TABLE contacts_partitioned RENAME TO contacts')
+    statements += [f'ALTER TABLE contacts RENAME CONSTRAINT {shadow} TO {name}' for name, shadow in CONSTRAINTS]
+    statements += [f'ALTER INDEX {shadow} RENAME TO {name}' for name, shadow in INDEXES]
+    statements.append('ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id')
+    return statements
+
+
+def unswap() -> List[str]:
+    """
+    Statements reversing :func:`swap`: ``contacts_old`` is brought up to date with
+    the partitioned table and put back, and mirroring resumes.
+    """
+    statements = [
+        'LOCK TABLE contacts IN EXCLUSIVE MODE',
+        'DELETE FROM contacts_old o WHERE NOT EXISTS (SELECT 1 FROM contacts c WHERE c.id = o.id)',
+        f'INSERT INTO contacts_old ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM contacts '
+        f'ON CONFLICT (id) DO UPDATE SET {_UPDATE_LIST}, user_id = EXCLUDED.user_id',
+    ]
+    statements += [f'ALTER TABLE contacts RENAME CONSTRAINT {name} TO {shadow}' for name, shadow in CONSTRAINTS]
+    statements += [f'ALTER INDEX {name} RENAME TO {shadow}' for name, shadow in INDEXES]
+    statements.append('ALTER TABLE contacts RENAME TO contacts_partitioned')
+    statements += [f'ALTER TABLE contacts_old RENAME CONSTRAINT {name.replace("contacts", "contacts_old", 1)} TO {name}'
+                   for name, _ in CONSTRAINTS]
+    statements += [f'ALTER INDEX {name.replace("contacts", "contacts_old", 1)} RENAME TO {name}' for name, _ in INDEXES]
+    statements += [
+        'ALTER TABLE contacts_old RENAME TO contacts',
+        'ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id',
+        'CREATE TABLE contacts_partition_progress (copied_up_to BIGINT NOT NULL)',
+        'INSERT INTO contacts_partition_progress SELECT coalesce(max(id), 0) FROM contacts',
+    ]
+    return statements + create_mirror_trigger()
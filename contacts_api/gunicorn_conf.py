@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for running the API with several Uvicorn workers.
+
+Usage::
+
+    gunicorn -c contacts_api/gunicorn_conf.py contacts_api.main:app
+
+The worker count defaults to the number of CPU cores and can be overridden with
+``WEB_CONCURRENCY``. The application is imported once in the master and forked
+(``preload_app``), so workers start quickly and share read-only memory.
+
+On ``SIGTERM`` workers stop accepting connections, finish in-flight requests and
+their background emails for up to ``GRACEFUL_TIMEOUT`` seconds, then run the
+application's shutdown. ``SIGHUP`` replaces workers one by one the same way; to
+roll out new code with preloading, start a new master with ``SIGUSR2`` and stop
+the old workers with ``SIGWINCH``.
+
+Set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory to aggregate ``/metrics``
+across workers.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.getenv('WORKER_TIMEOUT', 60))
+keepalive = int(os.getenv('KEEPALIVE', 5))
+max_requests = int(os.getenv('MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', 0))
+accesslog = os.getenv('ACCESS_LOG', '-')
+
+
+def post_fork(server, worker):
+    """
+    Drops database connections inherited from the master; each worker opens its own.
+    """
+    from contacts_api.database.db import dispose_engine
+    dispose_engine(close=False)
+
+
+def child_exit(server, worker):
+    """
+    Removes live gauge values of a worker that exited from the shared metrics directory.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,31 +1,124 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from contacts_api.routes import contacts, auth, users
-from contacts_api.conf.config import settings
-
-import redis.asyncio as redis
-from fastapi_limiter import FastAPILimiter
-
-app = FastAPI()
-
-origins = ['http://localhost:8000']
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=['*'],
-    allow_headers=['*'],
-)
-
-app.include_router(auth.router, prefix='/api')
-app.include_router(contacts.router, prefix='/api')
-app.include_router(users.router, prefix='/api')
-
-@app.on_event('startup')
-async def startup():
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding='utf-8', decode_responses=True)
-    await FastAPILimiter.init(r)
-    
-@app.get('/')
+from contacts_api.conf.config import Settings, get_settings
+from contacts_api.database.db import dispose_engine, warm_pool
+from contacts_api.services.redis_client import get_redis, close_redis
+from contacts_api.services import email as email_service
+from contacts_api.services.account_deletion import purger as account_purger
+from contacts_api.services.events import hub as event_hub
+from contacts_api.services.metrics import MetricsMiddleware, metrics_response
+from contacts_api.database.instrumentation import QueryDebugMiddleware
+from contacts_api.services.profiling import ProfilingMiddleware
+from contacts_api.services.admission import AdmissionControlMiddleware, bulkheads_from_settings
+from contacts_api.services.loop_monitor import LoopMonitor, RouteMarkerMiddleware
+from contacts_api.services.rate_limit import close_limiter, init_limiter
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifecycle: prepares shared resources on startup and releases them on shutdown.
+
+    Startup opens the database pool connections up front and connects the rate
+    limiter and the contact events hub to Redis; if Redis is down, the
+    application starts anyway and rate limits locally until it is back.
+    It also starts the event loop lag monitor. Shutdown cancels account purges
+    still running (they are resumed by ``purge_accounts``), waits for background
+    emails that are still being sent, then closes the shared Redis pool and the
+    database pool.
+
+    :param app: The application instance.
+    :type app: FastAPI
+    """
+    settings = get_settings()
+    await run_in_threadpool(warm_pool)
+    await init_limiter(get_redis('limiter'))
+    await event_hub.start()
+    loop_monitor = LoopMonitor(settings.loop_lag_interval,
+                               settings.loop_block_threshold if settings.loop_debug else None)
+    await loop_monitor.start()
+
+    yield
+
+    await loop_monitor.stop()
+    await event_hub.stop()
+    await account_purger.stop()
+
+    pending = await email_service.drain(settings.shutdown_drain_timeout)
+    if pending:
+        logger.warning('Shutting down with %d emails still being sent', pending)
+    await close_limiter()
+    await close_redis()
+    dispose_engine()
+
+
 def read_root():
-    return {'message': 'Hello World'}
\ No newline at end of file
+    return {'message': 'Hello World'}
+
+
+def metrics():
+    """
+    Expose application metrics in the Prometheus text format.
+
+    :return: Current values of all registered metrics.
+    :rtype: Response
+    """
+    return metrics_response()
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Builds the application, with the middleware stack chosen by the settings.
+
+    :param settings: Application settings, read from the environment by default.
+    :type settings: Settings | None
+    :return: The application.
+    :rtype: FastAPI
+    """
+    settings = settings or get_settings()
+    app = FastAPI(lifespan=lifespan)
+
+    # Added first so that CORS headers are set on the 503 responses it sheds.
+    if settings.admission_enabled:
+        app.add_middleware(AdmissionControlMiddleware, bulkheads=bulkheads_from_settings(settings))
+
+    origins = ['http://localhost:8000']
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=['*'],
+        allow_headers=['*'],
+        expose_headers=['X-Total-Count'],
+    )
+    if settings.loop_debug:
+        app.add_middleware(RouteMarkerMiddleware)
+    if settings.sql_debug:
+        app.add_middleware(QueryDebugMiddleware, n_plus_one_threshold=settings.sql_n_plus_one_threshold)
+    if settings.profiling_enabled and settings.profiling_token:
+        app.add_middleware(ProfilingMiddleware, token=settings.profiling_token, output_dir=settings.profiling_dir)
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(auth.router, prefix='/api')
+    app.include_router(contacts.router, prefix='/api')
+    app.include_router(users.router, prefix='/api')
+    app.get('/')(read_root)
+    app.get('/metrics', include_in_schema=False)(metrics)
+    return app
+
+
+def __getattr__(name: str):
+    # ``contacts_api.main:app`` is built on first use, so importing this module
+    # does not need the configuration.
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,13 +1,57 @@
-from typing import List
-from datetime import datetime, timedelta
+import base64
+import json
+from typing import List, Tuple
+from datetime import date, datetime, timedelta
 
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, and_
+from sqlalchemy import extract, and_, or_, func, select
 
-from contacts_api.database.models import Contact, User
-from contacts_api.schemas import ContactModel
+from contacts_api.database.db import releases_connection
+from contacts_api.database.models import Contact, ContactTombstone, User
+from contacts_api.schemas import (
+    ContactModel, ContactInDB, ContactRecord, ContactChanges, ContactStats, BatchOperation, BatchResult,
+)
+from contacts_api.services.coalescing import coalesce
+from contacts_api.services.events import publish_contact_change
 
-async def get_contacts(skip: int, limit: int, user: User, db: Session) -> List[Contact]:
+EPOCH = datetime(1970, 1, 1)
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+BATCH_CHANGES = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
+RECORD_COLUMNS = (Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone,
+                  Contact.birth_date, Contact.additional_info)
+
+def _records(statement, db: Session) -> List[ContactRecord]:
+    """Runs a select of ``RECORD_COLUMNS`` and wraps the rows, bypassing the ORM
+
+    :param statement: select of ``RECORD_COLUMNS``
+    :param db: database session
+    :type db: Session
+    :return: one record per row
+    :rtype: List[ContactRecord]
+    """
+    return [ContactRecord(*row) for row in db.execute(statement).all()]
+
+def _count_contacts(user_id: int, delta: int, db: Session) -> None:
+    """Adjusts the user's contact counter in the caller's transaction
+
+    The increment is done by the database (``contact_count = contact_count + delta``),
+    so concurrent writes of the same user do not lose updates.
+
+    :param user_id: owner of the contacts
+    :type user_id: int
+    :param delta: number of contacts added, negative for removed ones
+    :type delta: int
+    :param db: database session
+    :type db: Session
+    """
+    db.query(User).filter(User.id == user_id).update({User.contact_count: User.contact_count + delta},
+                                                      synchronize_session=False)
+
+@coalesce('skip', 'limit')
+@releases_connection
+async def get_contacts(skip: int, limit: int, user: User, db: Session) -> List[ContactRecord]:
     """returns every contact saved by current user
 
     :param skip: how many contacts will be skipped
@@ -18,12 +62,14 @@ async def get_contacts(skip: int, limit: int, user: User, db: Session) -> List[C
     :type user: User
     :param db: database session
     :type db: Session
-    :return: contacts saved in db by this user
-    :rtype: List[Contact]
+    :return: contacts saved in db by this user, as read-only records
+    :rtype: List[ContactRecord]
     """
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    return _records(select(*RECORD_COLUMNS).where(Contact.user_id == user.id).offset(skip).limit(limit), db)
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
+@coalesce('contact_id')
+@releases_connection
+async def get_contact(contact_id: int, user: User, db: Session) -> ContactRecord | None:
     """Searches for a record by it's index
 
     :param contact_id: searched index
@@ -32,12 +78,16 @@ async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
     :type user: User
     :param db: database session
     :type db: Session
-    :return: contact with given index
-    :rtype: Contact
+    :return: contact with given index, as a read-only record
+    :rtype: ContactRecord | None
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    records = _records(select(*RECORD_COLUMNS).where(
+        and_(Contact.id == contact_id, Contact.user_id == user.id)).limit(1), db)
+    return records[0] if records else None
 
-async def find_contact(query: str, user: User, db: Session) -> List[Contact] | None:
+@coalesce('query')
+@releases_connection
+async def find_contact(query: str, user: User, db: Session) -> List[ContactRecord] | None:
     """Searches for a contact by sequence of characters in email, last name or first name.
 
     :param query: sequence used to search through database
@@ -47,16 +97,16 @@ async def find_contact(query: str, user: User, db: Session) -> List[Contact] | N
     :param db: database session
     :type db: Session
     :return: matching records if found
-    :rtype: List[Contact] | None
+    :rtype: List[ContactRecord] | None
     """
-    contacts = db.query(Contact).filter(
+    contacts = _records(select(*RECORD_COLUMNS).where(
         (Contact.user_id == user.id) & 
         (
         (Contact.first_name.ilike(f'%{query}%')) |
         (Contact.last_name.ilike(f'%{query}%')) |
         (Contact.email.ilike(f'%{query}%'))
         )
-    ).all()
+    ), db)
     if contacts == []:
         return None
     else:
@@ -76,10 +126,81 @@ async def create_contact(body: ContactModel, user: User, db: Session) -> Contact
     """
     contact = Contact(**body.dict(), user_id=user.id)
     db.add(contact)
+    _count_contacts(user.id, 1, db)
     db.commit()
     db.refresh(contact)
+    publish_contact_change(contact.user_id, 'created', contact)
     return contact
 
+def _upsert_in_savepoint(body: ContactModel, user: User, db: Session) -> Tuple[Contact, bool]:
+    """Creates or updates the user's contact with the body's email by reading it first
+
+    For dialects without ``ON CONFLICT``. The read and the write run in a savepoint;
+    when a concurrent request inserts the same email in between, the insert fails
+    on the ``(user_id, email)`` constraint, the savepoint is rolled back and the
+    other request's row is read and updated instead.
+    """
+    values = body.dict()
+    for attempt in range(2):
+        savepoint = db.begin_nested()
+        try:
+            contact = db.query(Contact).filter(and_(Contact.user_id == user.id, Contact.email == body.email)).first()
+            now = datetime.utcnow()
+            created = contact is None
+            if created:
+                contact = Contact(**values, user_id=user.id, created_at=now, updated_at=now)
+                db.add(contact)
+            else:
+                for field, value in values.items():
+                    setattr(contact, field, value)
+                contact.updated_at = now
+            db.flush()
+            savepoint.commit()
+            return contact, created
+        except IntegrityError:
+            savepoint.rollback()
+            if attempt:
+                raise
+
+async def upsert_contact(body: ContactModel, user: User, db: Session) -> Tuple[ContactInDB, bool]:
+    """Creates a contact or updates the user's contact with the same email, in one statement
+
+    Uses ``INSERT ... ON CONFLICT (user_id, email) DO UPDATE ... RETURNING``, so there
+    is no read before the write and no race between concurrent upserts. Both
+    timestamps are set to the same value on insert, while an update keeps the
+    original ``created_at``, which tells the two outcomes apart. Dialects missing
+    from ``UPSERT_INSERTS`` read the contact first, see :func:`_upsert_in_savepoint`.
+
+    :param body: contact to save, identified by its email
+    :type body: ContactModel
+    :param user: current user
+    :type user: User
+    :param db: database session
+    :type db: Session
+    :return: saved contact and whether it was created
+    :rtype: Tuple[ContactInDB, bool]
+    """
+    insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        contact, created = _upsert_in_savepoint(body, user, db)
+    else:
+        now = datetime.utcnow()
+        values = body.dict()
+        statement = insert(Contact).values(**values, user_id=user.id, created_at=now, updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Contact.user_id, Contact.email],
+            set_={**{name: statement.excluded[name] for name in values}, 'updated_at': now},
+        ).returning(Contact)
+        contact = db.scalars(statement).one()
+        created = contact.created_at == contact.updated_at
+    result = ContactInDB.model_validate(contact, from_attributes=True)
+    user_id = contact.user_id
+    if created:
+        _count_contacts(user_id, 1, db)
+    db.commit()
+    publish_contact_change(user_id, 'created' if created else 'updated', result)
+    return result, created
+
 async def update_contact(contact_id: int, body: ContactModel, user: User, db: Session) -> Contact | None:
     """Updates an existing contact in database
 
@@ -103,6 +224,7 @@ async def update_contact(contact_id: int, body: ContactModel, user: User, db: Se
         contact.birth_date = body.birth_date
         contact.additional_info = body.additional_info
         db.commit()
+        publish_contact_change(contact.user_id, 'updated', contact)
     return contact
 
 async def remove_contact(contact_id: int, user: User, db: Session) -> Contact | None:
@@ -120,18 +242,168 @@ async def remove_contact(contact_id: int, user: User, db: Session) -> Contact |
     contact = db.query(Contact).filter(and_(Contact.user_id == user.id, Contact.id == contact_id)).first()
     if contact:
         db.delete(contact)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=user.id))
+        _count_contacts(user.id, -1, db)
         db.commit()
+        publish_contact_change(contact.user_id, 'deleted', contact)
     return contact
 
-async def get_birthdays(user: User, db: Session) -> List[Contact] | None:
+def encode_sync_token(contacts: Tuple[datetime, int], tombstones: Tuple[datetime, int]) -> str:
+    """Packs the positions reached in the contacts and tombstones streams into an opaque token
+
+    :param contacts: ``updated_at`` and id of the last contact returned
+    :type contacts: Tuple[datetime, int]
+    :param tombstones: ``deleted_at`` and id of the last tombstone returned
+    :type tombstones: Tuple[datetime, int]
+    :return: url-safe token
+    :rtype: str
+    """
+    payload = {'c': [contacts[0].isoformat(), contacts[1]], 'd': [tombstones[0].isoformat(), tombstones[1]]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+def decode_sync_token(token: str | None) -> Tuple[Tuple[datetime, int], Tuple[datetime, int]]:
+    """Reverses :func:`encode_sync_token`; no token means the beginning of both streams
+
+    :param token: token returned by a previous call, if any
+    :type token: str | None
+    :raises ValueError: if the token is malformed
+    :return: positions in the contacts and tombstones streams
+    :rtype: Tuple[Tuple[datetime, int], Tuple[datetime, int]]
+    """
+    if not token:
+        return (EPOCH, 0), (EPOCH, 0)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return ((datetime.fromisoformat(payload['c'][0]), int(payload['c'][1])),
+                (datetime.fromisoformat(payload['d'][0]), int(payload['d'][1])))
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        raise ValueError('Invalid sync token') from e
+
+@releases_connection
+async def get_changes(since: str | None, limit: int, user: User, db: Session,
+                      settle_seconds: float = 0) -> ContactChanges:
+    """Returns contacts created, updated or deleted after the position in ``since``
+
+    Both streams are read with keyset pagination on ``(updated_at, id)`` and
+    ``(deleted_at, id)``, using the ``(user_id, updated_at)`` and ``(user_id, deleted_at)``
+    indexes, so the cost depends on the number of changes rather than on the size
+    of the address book. Rows younger than ``settle_seconds`` are left for the next
+    call, so a change committed late with an earlier timestamp is not skipped.
+
+    :param since: token from the previous call, or None for a full download
+    :type since: str | None
+    :param limit: max number of changed and of deleted contacts returned
+    :type limit: int
+    :param user: current user
+    :type user: User
+    :param db: database session
+    :type db: Session
+    :param settle_seconds: how old a change must be to be returned
+    :type settle_seconds: float
+    :raises ValueError: if the token is malformed
+    :return: changed contacts, ids of deleted contacts and the token for the next call
+    :rtype: ContactChanges
+    """
+    (contacts_at, contact_id), (tombstones_at, tombstone_id) = decode_sync_token(since)
+    settled = datetime.utcnow() - timedelta(seconds=settle_seconds)
+
+    changed = db.query(Contact).filter(
+        Contact.user_id == user.id,
+        Contact.updated_at <= settled,
+        or_(Contact.updated_at > contacts_at, and_(Contact.updated_at == contacts_at, Contact.id > contact_id)),
+    ).order_by(Contact.updated_at, Contact.id).limit(limit).all()
+    deleted = db.query(ContactTombstone).filter(
+        ContactTombstone.user_id == user.id,
+        ContactTombstone.deleted_at <= settled,
+        or_(ContactTombstone.deleted_at > tombstones_at,
+            and_(ContactTombstone.deleted_at == tombstones_at, ContactTombstone.id > tombstone_id)),
+    ).order_by(ContactTombstone.deleted_at, ContactTombstone.id).limit(limit).all()
+
+    if changed:
+        contacts_at, contact_id = changed[-1].updated_at, changed[-1].id
+    if deleted:
+        tombstones_at, tombstone_id = deleted[-1].deleted_at, deleted[-1].id
+    return ContactChanges(
+        changed=[ContactInDB.model_validate(contact, from_attributes=True) for contact in changed],
+        deleted=[tombstone.contact_id for tombstone in deleted],
+        next_token=encode_sync_token((contacts_at, contact_id), (tombstones_at, tombstone_id)),
+        has_more=len(changed) == limit or len(deleted) == limit,
+    )
+
+def _apply_operation(operation: BatchOperation, user: User, db: Session) -> Contact | None:
+    if operation.op == 'create':
+        contact = Contact(**operation.body.dict(), user_id=user.id)
+        db.add(contact)
+        db.flush()
+        return contact
+    contact = db.query(Contact).filter(and_(Contact.id == operation.id, Contact.user_id == user.id)).first()
+    if contact is None:
+        return None
+    if operation.op == 'update':
+        for field, value in operation.body.dict().items():
+            setattr(contact, field, value)
+        db.flush()
+    elif operation.op == 'delete':
+        db.delete(contact)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=user.id))
+        db.flush()
+    return contact
+
+async def run_batch(operations: List[BatchOperation], user: User, db: Session) -> List[BatchResult]:
+    """Executes several contact operations in one transaction
+
+    Every operation runs in its own savepoint, so a failing operation is rolled back
+    on its own and reported in its result while the others are kept. Everything is
+    committed once at the end.
+
+    :param operations: create, read, update and delete operations, executed in order
+    :type operations: List[BatchOperation]
+    :param user: current user
+    :type user: User
+    :param db: database session
+    :type db: Session
+    :return: result of every operation, in the same order
+    :rtype: List[BatchResult]
+    """
+    results = []
+    changes = []
+    added = 0
+    for operation in operations:
+        savepoint = db.begin_nested()
+        try:
+            contact = _apply_operation(operation, user, db)
+            result = None if contact is None else ContactInDB.model_validate(contact, from_attributes=True)
+            savepoint.commit()
+        except IntegrityError:
+            savepoint.rollback()
+            results.append(BatchResult(status=409, detail='Contact with this email already exists'))
+            continue
+        if result is None:
+            results.append(BatchResult(status=404, detail='Contact not found'))
+        else:
+            results.append(BatchResult(status=201 if operation.op == 'create' else 200, contact=result))
+            if operation.op != 'read':
+                changes.append((operation.op, result))
+            added += {'create': 1, 'delete': -1}.get(operation.op, 0)
+    user_id = user.id
+    if added:
+        _count_contacts(user_id, added, db)
+    db.commit()
+    for op, contact in changes:
+        publish_contact_change(user_id, BATCH_CHANGES[op], contact)
+    return results
+
+@coalesce()
+@releases_connection
+async def get_birthdays(user: User, db: Session) -> List[ContactRecord] | None:
     """Checks who from saved contacts has birthday in a week
 
     :param user: current user
     :type user: User
     :param db: database session
     :type db: Session
-    :return: all contacts that have birthday in a week
-    :rtype: List[Contact] | None
+    :return: all contacts that have birthday in a week, as read-only records
+    :rtype: List[ContactRecord] | None
     """
     today = datetime.today().date()
     today_month = today.month
@@ -142,19 +414,89 @@ async def get_birthdays(user: User, db: Session) -> List[Contact] | None:
     next_week_day = next_week.day
 
     if today_month == next_week_month:
-        result =  db.query(Contact).filter(
+        result = _records(select(*RECORD_COLUMNS).where(
             Contact.user_id == user.id,
             extract('month', Contact.birth_date) == today_month,
             extract('day', Contact.birth_date).between(today_day, next_week_day)
-            ).all()
+            ), db)
     
     else:
-        result = db.query(Contact).filter(
+        result = _records(select(*RECORD_COLUMNS).where(
             Contact.user_id == user.id,
             (extract('month', Contact.birth_date) == today_month) & (extract('day', Contact.birth_date) >= today_day) |
             (extract('month', Contact.birth_date) == next_week_month) & (extract('day', Contact.birth_date) <= next_week_day)
-        ).all()
+        ), db)
     if result != []:
         return result
     else:
-        return result
\ No newline at end of file
+        return result
+
+@releases_connection
+async def get_stats(user: User, db: Session) -> ContactStats:
+    """Summarizes the user's address book
+
+    The total comes from the counter kept on the user, so it costs nothing however
+    many contacts the user has; only the birthdays are counted by a query.
+
+    :param user: current user
+    :type user: User
+    :param db: database session
+    :type db: Session
+    :return: number of contacts and of birthdays this month
+    :rtype: ContactStats
+    """
+    birthdays = db.query(func.count(Contact.id)).filter(
+        Contact.user_id == user.id,
+        extract('month', Contact.birth_date) == datetime.today().month,
+    ).scalar()
+    return ContactStats(total=user.contact_count, birthdays_this_month=birthdays)
+
+def birthday_keys(start: date, days: int) -> List[int]:
+    """Encodes the days from ``start`` on as ``month * 100 + day``, the form compared with birth dates
+
+    February 29 is included with February 28 in years without it.
+
+    :param start: first day
+    :type start: date
+    :param days: number of days
+    :type days: int
+    :return: one key per day
+    :rtype: List[int]
+    """
+    keys = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        keys.append(day.month * 100 + day.day)
+        if (day.month, day.day) == (2, 28) and (day + timedelta(days=1)).month == 3:
+            keys.append(229)
+    return keys
+
+async def get_birthdays_of_all_users(keys: List[int], after: Tuple[int, int], limit: int, db: Session) -> list:
+    """Reads the next page of contacts of all confirmed, enabled users whose birthday is on one of ``keys``
+
+    One set-based query per page instead of one query per user. Pages are keyed on
+    ``(user_id, id)``, so every page costs the same however far the job got, and all
+    contacts of a user are consecutive.
+
+    :param keys: days as returned by :func:`birthday_keys`
+    :type keys: List[int]
+    :param after: ``user_id`` and id of the last contact of the previous page, ``(0, 0)`` for the first page
+    :type after: Tuple[int, int]
+    :param limit: max number of contacts returned
+    :type limit: int
+    :param db: database session
+    :type db: Session
+    :return: rows with ``user_id``, ``email``, ``username``, ``id``, ``first_name``, ``last_name`` and ``birth_date``
+    :rtype: list
+    """
+    birthday = extract('month', Contact.birth_date) * 100 + extract('day', Contact.birth_date)
+    user_id, contact_id = after
+    return db.execute(
+        select(Contact.user_id, User.email, User.username, Contact.id, Contact.first_name, Contact.last_name,
+               Contact.birth_date)
+        .join(User, User.id == Contact.user_id)
+        .where(birthday.in_(keys), User.confirmed.is_(True), User.disabled.is_(False),
+               or_(Contact.user_id > user_id, and_(Contact.user_id == user_id, Contact.id > contact_id)))
+        .order_by(Contact.user_id, Contact.id)
+        .limit(limit)
+    ).all()
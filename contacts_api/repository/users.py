@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
-from contacts_api.database.models import User
+from contacts_api.database.db import releases_connection
+from contacts_api.database.models import AccountDeletion, User
 from contacts_api.schemas import UserModel
 
+@releases_connection
 async def get_user_by_email(email: str, db: Session) -> User | None:
     """Searches for an user in database by email
 
@@ -80,4 +82,45 @@ async def update_avatar(email, url: str, db: Session) -> User:
     user = await get_user_by_email(email, db)
     user.avatar = url
     db.commit()
-    return user
\ No newline at end of file
+    return user
+
+async def request_account_deletion(user: User, db: Session) -> AccountDeletion:
+    """
+    Disables a user and records that their account is to be deleted.
+
+    The user can no longer sign in or use their tokens from this point on; the
+    contacts and the user row are deleted later, in batches, by
+    :func:`contacts_api.services.account_deletion.purge_account`. Asking again
+    returns the deletion already in progress.
+
+    :param user: The user to delete.
+    :type user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The deletion, whose id is used to follow its progress.
+    :rtype: AccountDeletion
+    """
+    deletion = db.query(AccountDeletion).filter(AccountDeletion.user_id == user.id,
+                                                AccountDeletion.status != 'done').first()
+    if deletion is not None:
+        return deletion
+    user.disabled = True
+    user.refresh_token = None
+    deletion = AccountDeletion(user_id=user.id, contacts_total=user.contact_count)
+    db.add(deletion)
+    db.commit()
+    return deletion
+
+@releases_connection
+async def get_account_deletion(deletion_id: str, db: Session) -> AccountDeletion | None:
+    """
+    Reads the progress of an account deletion.
+
+    :param deletion_id: The id returned when the deletion was requested.
+    :type deletion_id: str
+    :param db: The database session.
+    :type db: Session
+    :return: The deletion, if it exists.
+    :rtype: AccountDeletion | None
+    """
+    return db.query(AccountDeletion).filter(AccountDeletion.id == deletion_id).first()
@@ -48,13 +48,15 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     :type body: OAuth2PasswordRequestForm
     :param db: The database session.
     :type db: Session
-    :raises HTTPException 401: If invalid credentials or email not confirmed.
+    :raises HTTPException 401: If invalid credentials, email not confirmed or account being deleted.
     :return: Access and refresh tokens.
     :rtype: dict
     """
     user = await repository_users.get_user_by_email(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid email')
+    if user.disabled:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Account is being deleted')
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Email not confirmed')
     if not auth_service.verify_password(body.password, user.password):
@@ -1,24 +1,44 @@
+import asyncio
+import json
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi_limiter.depends import RateLimiter
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from contacts_api.database.db import get_db
-from contacts_api.schemas import ContactModel, ContactInDB
+from contacts_api.conf.config import get_settings
+from contacts_api.schemas import ContactModel, ContactInDB, ContactRead, ContactChanges, ContactStats, BatchRequest, BatchResponse
 from contacts_api.repository import contacts as repository_contacts
 from contacts_api.routes.auth import auth_service
 from contacts_api.database.models import User
+from contacts_api.services.events import hub
+from contacts_api.services.idempotency import IdempotentRoute
+from contacts_api.services.negotiation import MsgPackRoute
+from contacts_api.services.rate_limit import ResilientRateLimiter, WeightedRateLimiter
 
-router = APIRouter(prefix='/contacts', tags=['contacts'])
 
-@router.get('/', response_model=List[ContactInDB], description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
-async def read_contacts(skip: int = 0, limit: int = 5, db: Session = Depends(get_db),
+class ContactsRoute(IdempotentRoute, MsgPackRoute):
+    """
+    Idempotency keys on mutating requests and MessagePack bodies on every request.
+    """
+
+
+router = APIRouter(prefix='/contacts', tags=['contacts'], route_class=ContactsRoute)
+batch_limiter = WeightedRateLimiter(times=100, seconds=60)
+
+@router.get('/', response_model=List[ContactRead], description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
+async def read_contacts(response: Response, skip: int = 0, limit: int = 5, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve contacts with rate limiting (10 requests per minute).
 
+    The total number of the user's contacts is returned in the ``X-Total-Count`` header.
+
+    :param response: The outgoing response.
+    :type response: Response
     :param skip: Number of records to skip.
     :type skip: int
     :param limit: Maximum number of records to retrieve.
@@ -29,13 +49,99 @@ async def read_contacts(skip: int = 0, limit: int = 5, db: Session = Depends(get
     :type current_user: User
     :raises HTTPException 404: If contacts not found.
     :return: List of contacts.
-    :rtype: List[ContactInDB]
+    :rtype: List[ContactRead]
     """
+    response.headers['X-Total-Count'] = str(current_user.contact_count)
     contacts = await repository_contacts.get_contacts(skip, limit, current_user, db)
     return contacts
 
-@router.get('/{contact_id}', response_model=ContactInDB, description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get('/stats', response_model=ContactStats, description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
+async def read_stats(db: Session = Depends(get_db),
+                     current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve the number of contacts and of birthdays this month, with rate limiting (10 requests per minute).
+
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :return: Contact statistics.
+    :rtype: ContactStats
+    """
+    return await repository_contacts.get_stats(current_user, db)
+
+@router.get('/changes', response_model=ContactChanges, description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
+async def read_changes(since: str | None = None, limit: int = Query(500, ge=1, le=1000),
+                       db: Session = Depends(get_db),
+                       current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contacts changed or deleted since a previous sync, with rate limiting (10 requests per minute).
+
+    Start without ``since`` to download everything, then pass the returned
+    ``next_token`` on the following call; repeat immediately while ``has_more`` is true.
+
+    :param since: Token returned by the previous call.
+    :type since: str | None
+    :param limit: Maximum number of changed and of deleted contacts returned.
+    :type limit: int
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :raises HTTPException 400: If the token is invalid.
+    :return: Changed contacts, ids of deleted contacts and the next token.
+    :rtype: ContactChanges
+    """
+    try:
+        return await repository_contacts.get_changes(since, limit, current_user, db,
+                                                     settle_seconds=get_settings().sync_settle_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get('/events', description='Server-sent events; no more than 10 connections pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
+async def stream_events(db: Session = Depends(get_db),
+                        current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Stream changes of the current user's contacts as server-sent events.
+
+    Every create, update and delete made from any device is sent as a ``contact``
+    event. A comment line is sent when nothing happened for a while, so proxies
+    keep the connection open. A client that falls behind receives a ``resync``
+    event and should catch up with ``GET /contacts/changes``.
+
+    :param db: The database session, released before streaming starts.
+    :type db: Session
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :return: Event stream.
+    :rtype: StreamingResponse
+    """
+    user_id = current_user.id
+    # The stream can stay open for hours; don't hold a pooled connection for it.
+    db.close()
+    settings = get_settings()
+
+    async def events():
+        async with hub.subscribe(user_id, settings.events_max_queued) as subscription:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield f'event: contact\ndata: {json.dumps(event)}\n\n'
+                if subscription.overflowed:
+                    return
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@router.get('/{contact_id:int}', response_model=ContactInDB, description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def read_contact(contact_id: int, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -56,8 +162,8 @@ async def read_contact(contact_id: int, db: Session = Depends(get_db),
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Contact not found')
     return contact
 
-@router.get('/{query}', response_model=List[ContactInDB], description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get('/{query}', response_model=List[ContactRead], description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def find_contact(query: str, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -71,7 +177,7 @@ async def find_contact(query: str, db: Session = Depends(get_db),
     :type current_user: User
     :raises HTTPException 404: If no contacts found.
     :return: List of matching contacts.
-    :rtype: List[ContactInDB]
+    :rtype: List[ContactRead]
     """
     contacts = await repository_contacts.find_contact(query, current_user, db)
     if contacts is None:
@@ -79,7 +185,7 @@ async def find_contact(query: str, db: Session = Depends(get_db),
     return contacts
 
 @router.post('/', response_model=ContactInDB, description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def create_contact(body: ContactModel, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -91,13 +197,68 @@ async def create_contact(body: ContactModel, db: Session = Depends(get_db),
     :type db: Session
     :param current_user: The current authenticated user.
     :type current_user: User
+    :raises HTTPException 409: If the user already has a contact with this email.
     :return: Created contact.
     :rtype: ContactInDB
     """
-    return await repository_contacts.create_contact(body, current_user, db)
+    try:
+        return await repository_contacts.create_contact(body, current_user, db)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Contact with this email already exists')
+
+@router.put('/', response_model=ContactInDB, description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
+async def upsert_contact(body: ContactModel, response: Response, db: Session = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Create a contact, or update the contact with the same email, with rate limiting (10 requests per minute).
+
+    :param body: The contact details; the email identifies the contact.
+    :type body: ContactModel
+    :param response: The outgoing response; its status is 201 when the contact was created.
+    :type response: Response
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :return: Saved contact.
+    :rtype: ContactInDB
+    """
+    contact, created = await repository_contacts.upsert_contact(body, current_user, db)
+    if created:
+        response.status_code = status.HTTP_201_CREATED
+    return contact
+
+@router.post('/batch', response_model=BatchResponse,
+             description='Every operation counts as one request; no more than 100 operations per minute')
+async def run_batch(body: BatchRequest, request: Request, response: Response, db: Session = Depends(get_db),
+                    current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Execute several create, read, update and delete operations in one request.
+
+    The user is authenticated once and all operations run in one transaction, each
+    in its own savepoint: a failing operation is reported in its result without
+    undoing the others.
+
+    :param body: The operations to execute, in order.
+    :type body: BatchRequest
+    :param request: The incoming request, used for rate limiting.
+    :type request: Request
+    :param response: The outgoing response, used for rate limiting.
+    :type response: Response
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :return: Status and contact of every operation, in the same order.
+    :rtype: BatchResponse
+    """
+    await batch_limiter.hit(request, response, weight=len(body.operations))
+    results = await repository_contacts.run_batch(body.operations, current_user, db)
+    return BatchResponse(results=results)
 
 @router.put('/{contact_id}', response_model=ContactInDB, description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def update_contact(body: ContactModel, contact_id: int, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -120,8 +281,8 @@ async def update_contact(body: ContactModel, contact_id: int, db: Session = Depe
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
     return contact
 
-@router.get('/contacts/upcoming_birthdays', response_model=List[ContactInDB], description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+@router.get('/contacts/upcoming_birthdays', response_model=List[ContactRead], description='No more than 10 requests pre minute',
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def get_birthdays(db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -132,7 +293,7 @@ async def get_birthdays(db: Session = Depends(get_db),
     :param current_user: The current authenticated user.
     :type current_user: User
     :return: List of contacts with upcoming birthdays.
-    :rtype: List[ContactInDB]
+    :rtype: List[ContactRead]
     """
     birthdays = await repository_contacts.get_birthdays(current_user, db)
     if birthdays is None:
@@ -140,7 +301,7 @@ async def get_birthdays(db: Session = Depends(get_db),
     return birthdays
 
 @router.delete('{contact_id}', response_model=ContactInDB, description='No more than 10 requests pre minute',
-            dependencies=[Depends(RateLimiter(times=10, seconds=60))])
+            dependencies=[Depends(ResilientRateLimiter(times=10, seconds=60))])
 async def remove_contact(contact_id: int, db: Session = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     """
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, status
 from sqlalchemy.orm import Session
 import cloudinary
 import cloudinary.uploader
@@ -6,12 +8,28 @@ import cloudinary.uploader
 from contacts_api.database.db import get_db
 from contacts_api.database.models import User
 from contacts_api.repository import users as repository_users
+from contacts_api.services.account_deletion import purger
 from contacts_api.services.auth import auth_service
-from contacts_api.conf.config import settings
-from contacts_api.schemas import UserDB
+from contacts_api.conf.config import get_settings
+from contacts_api.schemas import UserDB, AccountDeletionStatus
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+
+@lru_cache
+def configure_cloudinary() -> None:
+    """
+    Configures the Cloudinary client once, on the first avatar upload.
+    """
+    settings = get_settings()
+    cloudinary.config(
+        cloud_name=settings.cloudinary_name,
+        api_key=settings.cloudinary_api_key,
+        api_secret=settings.cloudinary_api_secret,
+        secure=True
+    )
+
+
 @router.get("/me/", response_model=UserDB, summary="Read Current User", description="Retrieve current user's details.")
 async def read_users_me(
     current_user: User = Depends(auth_service.get_current_user)
@@ -50,12 +68,7 @@ async def update_avatar_user(
     :return: Updated user details.
     :rtype: UserDB
     """
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
+    configure_cloudinary()
 
     r = cloudinary.uploader.upload(
         file.file,
@@ -67,4 +80,69 @@ async def update_avatar_user(
     )
 
     user = await repository_users.update_avatar(current_user.email, src_url, db)
-    return user
\ No newline at end of file
+    return user
+
+
+@router.delete(
+    "/me",
+    response_model=AccountDeletionStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Delete Account",
+    description="Disable the current account and delete it with all its contacts in the background.",
+)
+async def delete_account(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_db),
+) -> AccountDeletionStatus:
+    """
+    Delete the current user's account.
+
+    The account is disabled at once and its tokens stop working; contacts are
+    deleted afterwards in small batches. Progress is available at the URL in the
+    ``Location`` header. The purge runs outside of this request, which returns
+    as soon as the account is disabled.
+
+    :param request: The request details.
+    :type request: Request
+    :param response: The outgoing response.
+    :type response: Response
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: The deletion and its progress.
+    :rtype: AccountDeletionStatus
+    """
+    deletion = await repository_users.request_account_deletion(current_user, db)
+    purger.schedule(deletion.id)
+    response.headers["Location"] = str(request.url_for("read_account_deletion", deletion_id=deletion.id))
+    return deletion
+
+
+@router.get(
+    "/deletions/{deletion_id}",
+    response_model=AccountDeletionStatus,
+    summary="Read Account Deletion",
+    description="Follow the progress of an account deletion.",
+)
+async def read_account_deletion(deletion_id: str, db: Session = Depends(get_db)) -> AccountDeletionStatus:
+    """
+    Retrieve the progress of an account deletion.
+
+    No token is needed, as the account may already be gone; the id is an
+    unguessable random value known only to the user who asked for the deletion.
+
+    :param deletion_id: The id returned when the deletion was requested.
+    :type deletion_id: str
+    :param db: The database session.
+    :type db: Session
+    :raises HTTPException 404: If the deletion does not exist.
+    :return: The deletion and its progress.
+    :rtype: AccountDeletionStatus
+    """
+    deletion = await repository_users.get_account_deletion(deletion_id, db)
+    if deletion is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion not found")
+    return deletion
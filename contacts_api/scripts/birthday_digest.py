@@ -0,0 +1,147 @@
+"""
+Emails every confirmed user one digest of their contacts' upcoming birthdays.
+
+Birthdays of all users are read with one set-based query per page of contacts,
+in ``(user_id, id)`` order, and each user's digest is sent as soon as their
+contacts have been read, through a small pool of SMTP connections. Run it once
+a day, from cron or as a long-running worker::
+
+    python -m contacts_api.scripts.birthday_digest --days 7
+    python -m contacts_api.scripts.birthday_digest --at 07:00
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from contacts_api.conf.config import get_settings
+from contacts_api.database.db import SessionLocal, get_engine
+from contacts_api.repository.contacts import birthday_keys, get_birthdays_of_all_users
+from contacts_api.services.email import SMTPPool, get_mail_config, send_birthday_digest
+
+logger = logging.getLogger(__name__)
+
+
+def next_birthday(birth_date: date, today: date) -> date:
+    """
+    Returns the first birthday on or after ``today``; February 29 falls on February 28 in other years.
+    """
+    for year in (today.year, today.year + 1):
+        try:
+            birthday = birth_date.replace(year=year)
+        except ValueError:
+            birthday = date(year, 2, 28)
+        if birthday >= today:
+            return birthday
+
+
+async def run(db: Session, pool: SMTPPool, days: int, today: date, batch_size: int = 5_000,
+              send=send_birthday_digest) -> Dict:
+    """
+    Sends the digests of one day.
+
+    :param db: database session.
+    :type db: Session
+    :param pool: SMTP connections to send through.
+    :type pool: SMTPPool
+    :param days: number of days the digest covers, starting today.
+    :type days: int
+    :param today: first day of the digest.
+    :type today: date
+    :param batch_size: contacts read per query.
+    :type batch_size: int
+    :param send: coroutine function sending one digest, with the signature of :func:`send_birthday_digest`.
+    :return: number of users mailed, of birthdays in the digests and of failed emails.
+    :rtype: Dict
+    """
+    keys = birthday_keys(today, days)
+    stats = {'users': 0, 'birthdays': 0, 'failed': 0}
+
+    async def send_digest(rows: list) -> None:
+        birthdays = sorted((next_birthday(row.birth_date, today), f'{row.first_name} {row.last_name}')
+                           for row in rows)
+        try:
+            await send(pool, rows[0].email, rows[0].username,
+                       [{'date': day.strftime('%d %B'), 'name': name} for day, name in birthdays], days)
+        except Exception as e:
+            stats['failed'] += 1
+            logger.warning('Birthday digest for user %s not sent: %s', rows[0].user_id, e)
+            return
+        stats['users'] += 1
+        stats['birthdays'] += len(rows)
+
+    after = (0, 0)
+    pending: List[list] = []
+    while True:
+        rows = await get_birthdays_of_all_users(keys, after, batch_size, db)
+        if not rows:
+            break
+        after = (rows[-1].user_id, rows[-1].id)
+        for row in rows:
+            if pending and pending[-1][0].user_id == row.user_id:
+                pending[-1].append(row)
+            else:
+                pending.append([row])
+        # The last user's contacts may continue on the next page.
+        digests, pending = pending[:-1], pending[-1:]
+        await asyncio.gather(*(send_digest(user_rows) for user_rows in digests))
+    await asyncio.gather(*(send_digest(user_rows) for user_rows in pending))
+    return stats
+
+
+def seconds_until(at: str, now: datetime) -> float:
+    """
+    Seconds from ``now`` until the next ``HH:MM``.
+    """
+    hour, minute = map(int, at.split(':'))
+    start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if start <= now:
+        start += timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+async def run_once(days: int, batch_size: int, connections: int) -> Dict:
+    """
+    Sends today's digests with the application's database and SMTP settings.
+    """
+    pool = SMTPPool(get_mail_config(), connections)
+    db = SessionLocal(bind=get_engine())
+    started = time.perf_counter()
+    try:
+        stats = await run(db, pool, days, date.today(), batch_size)
+    finally:
+        db.close()
+        await pool.close()
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line entry point.
+    """
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=settings.birthday_digest_days, help='days covered, from today')
+    parser.add_argument('--batch-size', type=int, default=5_000, help='contacts read per query')
+    parser.add_argument('--smtp-connections', type=int, default=settings.smtp_pool_size,
+                        help='SMTP connections used in parallel')
+    parser.add_argument('--at', help='keep running and send the digests every day at HH:MM (local time)')
+    args = parser.parse_args(argv)
+
+    while True:
+        if args.at:
+            await asyncio.sleep(seconds_until(args.at, datetime.now()))
+        print(await run_once(args.days, args.batch_size, args.smtp_connections), file=sys.stderr)
+        if not args.at:
+            return
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""
+Creates the database tables that do not exist yet.
+
+Importing the application no longer touches the database, so a fresh development
+database is prepared with this script (or ``alembic upgrade main@head``)::
+
+    python -m contacts_api.scripts.init_db
+"""
+import argparse
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+
+from contacts_api.conf.config import get_settings
+from contacts_api.database.models import create_schema
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help='target database, defaults to SQLALCHEMY_DATABASE_URL')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db_url or get_settings().sqlalchemy_database_url)
+    create_schema(engine)
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
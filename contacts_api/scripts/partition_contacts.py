@@ -0,0 +1,107 @@
+"""
+Online copy of ``contacts`` into its hash-partitioned replacement (PostgreSQL).
+
+Run after ``alembic upgrade e7b4c9d1a2f3`` and before upgrading the
+``partitioning`` branch to its head::
+
+    alembic -x partitions=32 upgrade e7b4c9d1a2f3
+    python -m contacts_api.scripts.partition_contacts --batch-size 5000
+    python -m contacts_api.scripts.partition_contacts --verify
+    alembic upgrade partitioning@head
+    python -m contacts_api.scripts.partition_contacts --drop-old
+
+Rows are copied in id order, one short transaction per batch, while the
+application keeps writing; the mirror trigger installed by the migration keeps
+copied rows current. The copy resumes where it stopped when interrupted.
+Upgrading to the branch head fails without swapping while the copy is far behind.
+See ``contacts_api.database.partitioning`` for the whole procedure.
+"""
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine, text
+
+from contacts_api.conf.config import get_settings
+from contacts_api.database import partitioning
+
+
+def copy(engine, batch_size: int, pause: float, progress=print) -> int:
+    """
+    Copies every row not copied yet, in batches.
+
+    :param engine: PostgreSQL database after the shadow table migration.
+    :param batch_size: rows per transaction.
+    :type batch_size: int
+    :param pause: seconds to sleep between batches, to leave headroom for the application.
+    :type pause: float
+    :param progress: called with a progress message after every batch.
+    :return: number of batches copied.
+    :rtype: int
+    """
+    with engine.connect() as conn:
+        after_id = conn.execute(text('SELECT copied_up_to FROM contacts_partition_progress')).scalar()
+        last_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM contacts')).scalar()
+    started = time.perf_counter()
+    batches = 0
+    while True:
+        with engine.begin() as conn:
+            copied_up_to = partitioning.copy_batch(conn, after_id, batch_size)
+        if copied_up_to is None:
+            return batches
+        batches += 1
+        after_id = copied_up_to
+        elapsed = time.perf_counter() - started
+        progress(f'copied up to id {after_id} of {last_id}, {batches * batch_size / elapsed:,.0f} rows/s')
+        if pause:
+            time.sleep(pause)
+
+
+def verify(engine) -> bool:
+    """
+    Compares row counts and id ranges of both tables.
+
+    :param engine: PostgreSQL database after the shadow table migration.
+    :return: whether the tables hold the same rows.
+    :rtype: bool
+    """
+    query = 'SELECT count(*), coalesce(min(id), 0), coalesce(max(id), 0), coalesce(sum(id), 0) FROM {}'
+    with engine.connect() as conn:
+        source = tuple(conn.execute(text(query.format('contacts'))).one())
+        target = tuple(conn.execute(text(query.format('contacts_partitioned'))).one())
+    print(f'contacts (count, min id, max id, id sum): {source}\ncontacts_partitioned: {target}')
+    return source == target
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help='target database, defaults to SQLALCHEMY_DATABASE_URL')
+    parser.add_argument('--batch-size', type=int, default=5_000, help='rows per transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to wait between batches')
+    parser.add_argument('--verify', action='store_true', help='compare both tables instead of copying')
+    parser.add_argument('--drop-old', action='store_true', help='drop contacts_old after the swap')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db_url or get_settings().sqlalchemy_database_url)
+    if engine.dialect.name != 'postgresql':
+        parser.error('partitioning is only supported on PostgreSQL')
+    try:
+        if args.drop_old:
+            with engine.begin() as conn:
+                conn.execute(text('DROP TABLE contacts_old'))
+            return 0
+        if args.verify:
+            return 0 if verify(engine) else 1
+        batches = copy(engine, args.batch_size, args.pause, progress=lambda message: print(message, file=sys.stderr))
+        print(f'done, {batches} batches copied')
+        return 0
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Finishes account deletions that were requested but not completed.
+
+Deletions normally run as background tasks of the API process that accepted
+them; if that process stops before a deletion is finished, it stays pending or
+running. Run this periodically, or keep it running with ``--every``::
+
+    python -m contacts_api.scripts.purge_accounts --every 60
+
+A deletion still being worked on elsewhere is skipped until its progress has
+stalled for ``ACCOUNT_PURGE_STALE_SECONDS``.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services.account_deletion import purge_account, unfinished_deletions
+
+
+async def purge_all(engine: Engine) -> int:
+    """
+    Purges every unfinished deletion this process can claim, one at a time.
+
+    :param engine: target database.
+    :type engine: Engine
+    :return: number of accounts purged.
+    :rtype: int
+    """
+    return sum([await purge_account(deletion_id, engine) for deletion_id in unfinished_deletions(engine)])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help='target database, defaults to SQLALCHEMY_DATABASE_URL')
+    parser.add_argument('--every', type=float, metavar='SECONDS', help='keep running, checking at this interval')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db_url or get_settings().sqlalchemy_database_url)
+    try:
+        while True:
+            purged = asyncio.run(purge_all(engine))
+            print(f'{purged} accounts purged', file=sys.stderr)
+            if args.every is None:
+                return 0
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Recounts the contacts of every user and corrects ``users.contact_count``.
+
+The counter is maintained by every write of the API, in the same transaction as
+the write, so it only drifts after writes that bypass the API (manual SQL, bulk
+imports, restored backups). Run this periodically, e.g. nightly from cron::
+
+    python -m contacts_api.scripts.reconcile_contact_counts --batch-size 1000
+
+Users are processed in id order, one short transaction per batch; the rows of a
+batch are locked while it is recounted, so writes of those users wait instead
+of racing with the correction.
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.engine import Engine
+
+from contacts_api.conf.config import get_settings
+from contacts_api.database.models import Contact, User
+
+
+def reconcile(engine: Engine, batch_size: int = 1_000, after_id: int = 0, progress=None) -> int:
+    """
+    Corrects the contact counters of all users with an id above ``after_id``.
+
+    :param engine: target database.
+    :type engine: Engine
+    :param batch_size: users per transaction.
+    :type batch_size: int
+    :param after_id: users up to this id are skipped.
+    :type after_id: int
+    :param progress: optional callable receiving progress messages.
+    :return: number of users whose counter was wrong.
+    :rtype: int
+    """
+    report = progress or (lambda message: None)
+    count = select(func.count(Contact.id)).where(Contact.user_id == User.id).scalar_subquery()
+    corrected = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(User.id).where(User.id > after_id).order_by(User.id).limit(batch_size).with_for_update()
+            ).scalars().all()
+            if not ids:
+                return corrected
+            corrected += conn.execute(
+                update(User).where(User.id.between(ids[0], ids[-1]), User.contact_count != count)
+                .values(contact_count=count)
+            ).rowcount
+        after_id = ids[-1]
+        report(f'users up to id {after_id} checked, {corrected} corrected')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help='target database, defaults to SQLALCHEMY_DATABASE_URL')
+    parser.add_argument('--batch-size', type=int, default=1_000, help='users per transaction')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db_url or get_settings().sqlalchemy_database_url)
+    try:
+        corrected = reconcile(engine, args.batch_size, progress=lambda message: print(message, file=sys.stderr))
+    finally:
+        engine.dispose()
+    print(f'{corrected} contact counters corrected')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
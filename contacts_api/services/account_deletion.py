@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Set
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from contacts_api.conf.config import get_settings
+from contacts_api.database.db import get_engine
+from contacts_api.database.models import AccountDeletion, Contact, ContactTombstone, User
+from contacts_api.services.metrics import ACCOUNT_PURGE_DELETED
+
+logger = logging.getLogger(__name__)
+
+
+def claim(engine: Engine, deletion_id: str, stale_seconds: float) -> int | None:
+    """
+    Marks a deletion as running, unless another purge is already working on it.
+
+    A running deletion whose progress has not moved for ``stale_seconds`` is taken
+    over, so a purge interrupted by a restart is resumed.
+
+    :param engine: database engine.
+    :type engine: Engine
+    :param deletion_id: deletion to claim.
+    :type deletion_id: str
+    :param stale_seconds: inactivity after which a running deletion is taken over.
+    :type stale_seconds: float
+    :return: id of the user to purge, or None if the deletion was not claimed.
+    :rtype: int | None
+    """
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        claimed = conn.execute(
+            update(AccountDeletion)
+            .where(AccountDeletion.id == deletion_id,
+                   or_(AccountDeletion.status == 'pending',
+                       (AccountDeletion.status == 'running')
+                       & (AccountDeletion.updated_at < now - timedelta(seconds=stale_seconds))))
+            .values(status='running', updated_at=now)
+        ).rowcount
+        if not claimed:
+            return None
+        return conn.execute(select(AccountDeletion.user_id).where(AccountDeletion.id == deletion_id)).scalar()
+
+
+def _delete_batch(engine: Engine, table, user_id: int, deletion_id: str, batch_size: int, count: bool) -> int:
+    # One short transaction: a batch of rows and the progress it made.
+    with engine.begin() as conn:
+        batch = select(table.id).where(table.user_id == user_id).limit(batch_size)
+        deleted = conn.execute(delete(table).where(table.id.in_(batch))).rowcount
+        counted = deleted if count else 0
+        conn.execute(update(AccountDeletion).where(AccountDeletion.id == deletion_id).values(
+            contacts_deleted=AccountDeletion.contacts_deleted + counted, updated_at=datetime.utcnow()))
+    ACCOUNT_PURGE_DELETED.inc(counted)
+    return deleted
+
+
+async def _delete_in_batches(engine: Engine, table, user_id: int, deletion_id: str, batch_size: int, pause: float,
+                             count: bool) -> None:
+    while await run_in_threadpool(_delete_batch, engine, table, user_id, deletion_id, batch_size, count) == batch_size:
+        # Leave room for the application's own queries and for replication.
+        await asyncio.sleep(pause)
+
+
+def _finish(engine: Engine, user_id: int, deletion_id: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(delete(User).where(User.id == user_id))
+        now = datetime.utcnow()
+        conn.execute(update(AccountDeletion).where(AccountDeletion.id == deletion_id)
+                     .values(status='done', updated_at=now, finished_at=now))
+
+
+async def purge_account(deletion_id: str, engine: Engine | None = None) -> bool:
+    """
+    Deletes the contacts of a disabled user in bounded batches, then the user.
+
+    Every batch is its own short transaction, run in the threadpool, and records
+    its progress, so the table is never locked for long, the work can be followed
+    while it runs, and an interrupted purge continues where it stopped. Between
+    batches the event loop is free. The user row goes last, when the
+    ``ON DELETE CASCADE`` foreign keys have nothing left to delete.
+
+    :param deletion_id: deletion returned by ``request_account_deletion``.
+    :type deletion_id: str
+    :param engine: database engine, the application's by default.
+    :type engine: Engine | None
+    :return: whether this call purged the account; False if another purge owns it or it is done.
+    :rtype: bool
+    """
+    engine = engine or get_engine()
+    settings = get_settings()
+    user_id = await run_in_threadpool(claim, engine, deletion_id, settings.account_purge_stale_seconds)
+    if user_id is None:
+        return False
+    started = time.perf_counter()
+    batch_size, pause = settings.account_purge_batch_size, settings.account_purge_pause
+    await _delete_in_batches(engine, Contact, user_id, deletion_id, batch_size, pause, count=True)
+    await _delete_in_batches(engine, ContactTombstone, user_id, deletion_id, batch_size, pause, count=False)
+    await run_in_threadpool(_finish, engine, user_id, deletion_id)
+    logger.info('Account %s purged in %.1fs', user_id, time.perf_counter() - started)
+    return True
+
+
+class AccountPurger:
+    """
+    Runs account purges in the API process, outside of the requests asking for them.
+
+    A purge can take minutes; as a task of its own it holds no request slot,
+    worker thread or admission slot while it runs and does not count towards the
+    latency of ``DELETE /users/me``. Purges still running at shutdown are
+    cancelled between batches and stay ``running``; ``purge_accounts`` takes
+    them over once they have stalled.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    def schedule(self, deletion_id: str) -> None:
+        """
+        Starts purging the account of a deletion in the background.
+
+        :param deletion_id: deletion returned by ``request_account_deletion``.
+        :type deletion_id: str
+        """
+        task = asyncio.create_task(self._purge(deletion_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        """
+        Cancels the purges still running; called from the lifespan.
+        """
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _purge(deletion_id: str) -> None:
+        try:
+            await purge_account(deletion_id)
+        except Exception:
+            logger.exception('Purge of deletion %s failed; purge_accounts will resume it', deletion_id)
+
+
+purger = AccountPurger()
+
+
+def unfinished_deletions(engine: Engine | None = None) -> List[str]:
+    """
+    Returns the ids of deletions not finished yet, oldest first.
+
+    :param engine: database engine, the application's by default.
+    :type engine: Engine | None
+    :rtype: List[str]
+    """
+    with (engine or get_engine()).connect() as conn:
+        return conn.execute(select(AccountDeletion.id).where(AccountDeletion.status != 'done')
+                            .order_by(AccountDeletion.requested_at)).scalars().all()
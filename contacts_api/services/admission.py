@@ -0,0 +1,187 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from contacts_api.conf.config import Settings
+from contacts_api.services.metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED,
+)
+
+GROUPS = ('auth', 'contact_reads', 'contact_writes', 'uploads')
+READ_METHODS = {'GET', 'HEAD'}
+# Event streams stay open for minutes; they are limited by connection count instead.
+UNLIMITED_PATHS = {'/api/contacts/events'}
+
+
+def route_group(method: str, path: str) -> str | None:
+    """
+    Returns the bulkhead a request belongs to, or None if it is not limited.
+
+    :param method: HTTP method.
+    :type method: str
+    :param path: request path.
+    :type path: str
+    :rtype: str | None
+    """
+    if method == 'OPTIONS':
+        return None
+    if path.startswith('/api/auth/'):
+        return 'auth'
+    if path == '/api/users/avatar':
+        return 'uploads'
+    if path.startswith('/api/contacts') and path not in UNLIMITED_PATHS:
+        return 'contact_reads' if method in READ_METHODS else 'contact_writes'
+    return None
+
+
+class Bulkhead:
+    """
+    Concurrency limit with a bounded, deadline-limited waiting queue.
+
+    At most ``concurrency`` holders run at once. Further callers wait in FIFO
+    order, at most ``queue_size`` of them and for at most ``queue_timeout``
+    seconds; a caller that does not get a slot is rejected instead of piling up.
+
+    :param name: group name used in metrics.
+    :type name: str
+    :param concurrency: slots.
+    :type concurrency: int
+    :param queue_size: callers allowed to wait for a slot.
+    :type queue_size: int
+    :param queue_timeout: longest wait for a slot, in seconds.
+    :type queue_timeout: float
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> str | None:
+        """
+        Takes a slot, waiting in the queue if needed.
+
+        :return: None once a slot is held, else why it was refused: ``'queue_full'`` or ``'timeout'``.
+        :rtype: str | None
+        """
+        if self.active < self.concurrency and not self._waiters:
+            self._take()
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return 'queue_full'
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        start = time.perf_counter()
+        try:
+            # ``asyncio.wait`` leaves the future alone on timeout, so a slot handed
+            # over at the last moment is not lost.
+            await asyncio.wait([waiter], timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._forget(waiter)
+            raise
+        if not waiter.done():
+            self._forget(waiter)
+            return 'timeout'
+        ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start)
+        return None
+
+    def release(self) -> None:
+        """
+        Frees a slot, handing it straight to the longest waiting caller.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+
+    def _take(self) -> None:
+        self.active += 1
+        ADMISSION_IN_FLIGHT.labels(self.name).inc()
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        self._waiters.remove(waiter)
+        waiter.cancel()
+        ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+
+
+def bulkheads_from_settings(settings: Settings) -> Dict[str, Bulkhead]:
+    """
+    Builds one bulkhead per route group from the ``admission_<group>_*`` settings.
+
+    :param settings: application settings.
+    :type settings: Settings
+    :rtype: Dict[str, Bulkhead]
+    """
+    return {
+        group: Bulkhead(group,
+                        getattr(settings, f'admission_{group}_concurrency'),
+                        getattr(settings, f'admission_{group}_queue'),
+                        getattr(settings, f'admission_{group}_timeout'))
+        for group in GROUPS
+    }
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware isolating route groups from each other with bulkheads.
+
+    Each group (sign-in and tokens, contact reads, contact writes, avatar
+    uploads) has its own concurrency limit and waiting queue per worker, so a
+    login storm or slow searches use up their own group's slots but never those
+    of cheap contact reads. Requests that find the queue full, or wait longer
+    than the group's deadline, are shed with 503 and a ``Retry-After`` header
+    before any work is done for them.
+
+    :param app: the wrapped application.
+    :type app: ASGIApp
+    :param bulkheads: bulkhead per group, see :func:`bulkheads_from_settings`.
+    :type bulkheads: Dict[str, Bulkhead]
+    """
+
+    def __init__(self, app: ASGIApp, bulkheads: Dict[str, Bulkhead]) -> None:
+        self.app = app
+        self.bulkheads = bulkheads
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        bulkhead = self.bulkheads.get(route_group(scope['method'], scope['path']))
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        refused = await bulkhead.acquire()
+        if refused is not None:
+            ADMISSION_REJECTED.labels(bulkhead.name, refused).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={'detail': 'Server is busy, try again later'},
+                headers={'Retry-After': str(max(math.ceil(bulkhead.queue_timeout), 1))},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.release()
@@ -10,7 +10,8 @@ from sqlalchemy.orm import Session
 
 from contacts_api.database.db import get_db
 from contacts_api.repository import users as repository_users
-from contacts_api.conf.config import settings
+from contacts_api.conf.config import get_settings
+from contacts_api.services.redis_client import get_redis
 
 
 class Auth:
@@ -19,12 +20,21 @@ class Auth:
     """
 
     pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY: str = settings.secret_key
-    ALGORITHM: str = settings.algorithm
     oauth2_scheme: OAuth2PasswordBearer = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r: redis.Redis = redis.Redis(
-        host=settings.redis_host, port=settings.redis_port, db=0
-    )
+    @property
+    def SECRET_KEY(self) -> str:
+        return get_settings().secret_key
+
+    @property
+    def ALGORITHM(self) -> str:
+        return get_settings().algorithm
+
+    @property
+    def r(self) -> redis.Redis:
+        """
+        Redis client backed by the application-wide connection pool.
+        """
+        return get_redis('auth')
 
     def verify_password(self, plain_pass: str, hash_pass: str) -> bool:
         """
@@ -134,7 +144,7 @@ class Auth:
             raise credentials_exception from e
         
         user = await repository_users.get_user_by_email(email, db)
-        if user is None:
+        if user is None or user.disabled:
             raise credentials_exception
         return user
 
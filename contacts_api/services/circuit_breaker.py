@@ -0,0 +1,104 @@
+import logging
+import time
+
+from contacts_api.services.metrics import REDIS_BREAKER_TRANSITIONS, REDIS_DEGRADED, REDIS_DEGRADED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that keeps failing, and probes it until it recovers.
+
+    The breaker is closed while calls succeed. After ``failure_threshold``
+    consecutive failures it opens: :meth:`allow` refuses every call, so callers
+    take their fallback at once instead of waiting for timeouts. After
+    ``reset_timeout`` seconds it is half-open and lets one trial call through; a
+    success closes it, a failure opens it again.
+
+    The time spent open or half-open is recorded in
+    ``contacts_redis_degraded_seconds_total``.
+
+    :param failure_threshold: consecutive failures that open the breaker.
+    :type failure_threshold: int
+    :param reset_timeout: seconds to stay open before a trial call.
+    :type reset_timeout: float
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started: float | None = None
+        self._accounted_at = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return self.state != CLOSED
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now.
+
+        :rtype: bool
+        """
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        self._account(now)
+        if self.state == OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self._transition(HALF_OPEN)
+        # Half-open: one trial call at a time; a trial that never reported back
+        # is given up on after another reset timeout.
+        if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+            return False
+        self._trial_started = now
+        return True
+
+    def record_success(self) -> None:
+        """
+        Reports a successful call, closing the breaker if it was probing.
+        """
+        self._failures = 0
+        if self.state != CLOSED:
+            self._account(time.monotonic())
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """
+        Reports a failed call, opening the breaker once failures pile up.
+        """
+        self._failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+            now = time.monotonic()
+            if self.state == CLOSED:
+                self._accounted_at = now
+            else:
+                self._account(now)
+            self._opened_at = now
+            self._transition(OPEN)
+
+    def _account(self, now: float) -> None:
+        REDIS_DEGRADED_SECONDS.inc(max(now - self._accounted_at, 0))
+        self._accounted_at = now
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        if state == CLOSED:
+            logger.warning('Redis recovered, leaving degraded mode')
+            REDIS_DEGRADED.dec()
+        elif self.state == CLOSED:
+            logger.warning('Redis unavailable after %d failures, entering degraded mode', self._failures)
+            REDIS_DEGRADED.inc()
+        self.state = state
+        self._trial_started = None
+        REDIS_BREAKER_TRANSITIONS.labels(state).inc()
@@ -0,0 +1,129 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from starlette.concurrency import run_in_threadpool
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services.metrics import COALESCED_CALLS
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the call; callers arriving with
+    the same key while it is in flight (followers) wait for its result instead of
+    running the call again. Followers wait at most ``wait_timeout`` seconds and then
+    run the call themselves, so a stuck leader cannot hold them indefinitely.
+    Only in-flight calls are shared; nothing is cached once the leader finishes.
+
+    :param name: value of the ``function`` metrics label.
+    :type name: str
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]], wait_timeout: float) -> Any:
+        """
+        Runs ``call`` or joins the identical call already in flight for ``key``.
+
+        :param key: identifies calls that return the same result.
+        :type key: Hashable
+        :param call: starts the call when this caller is the leader.
+        :type call: Callable[[], Awaitable[Any]]
+        :param wait_timeout: maximum time a follower waits for the leader, in seconds.
+        :type wait_timeout: float
+        :return: result of the call.
+        :rtype: Any
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), wait_timeout)
+            except asyncio.TimeoutError:
+                COALESCED_CALLS.labels(self.name, 'fallback').inc()
+                return await call()
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled (its client went away), not this caller.
+                COALESCED_CALLS.labels(self.name, 'fallback').inc()
+                return await call()
+            COALESCED_CALLS.labels(self.name, 'follower').inc()
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        COALESCED_CALLS.labels(self.name, 'leader').inc()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve it once, so a failure nobody waited for is not logged by asyncio.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+def _run_to_completion(coroutine_function: Callable, args: tuple, kwargs: dict) -> Any:
+    # The repository functions are coroutines that never suspend (their queries are
+    # blocking), so they can be driven to completion in a worker thread.
+    coroutine = coroutine_function(*args, **kwargs)
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError(f'{coroutine_function.__qualname__} suspended; it cannot be coalesced')
+
+
+def coalesce(*key_params: str):
+    """
+    Decorates a read function of the repository so that concurrent identical calls
+    for the same user share one database query.
+
+    Calls are identical when they are made for the same ``user`` with equal values
+    of ``key_params``. The query runs in the threadpool, so the event loop keeps
+    serving (and collecting followers) while it executes. Followers receive the
+    leader's result objects, so the function must return plain read-only values
+    such as ``ContactRecord``, never ORM instances: those belong to the leader's
+    session and cannot be used from another request.
+
+    :param key_params: names of the parameters that, together with the user, select the result.
+    :type key_params: str
+    :return: decorator for an ``async`` repository function taking ``user`` and ``db``.
+    :rtype: Callable
+    """
+
+    def decorator(func):
+        flight = SingleFlight(func.__name__)
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            user = bound.arguments['user']
+            key = (user.id,) + tuple(bound.arguments[name] for name in key_params)
+            return await flight.do(
+                key,
+                lambda: run_in_threadpool(_run_to_completion, func, args, kwargs),
+                get_settings().coalesce_wait_timeout,
+            )
+
+        wrapper.single_flight = flight
+        return wrapper
+
+    return decorator
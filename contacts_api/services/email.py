@@ -1,25 +1,48 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from functools import lru_cache
 from pathlib import Path
+from typing import AsyncIterator, List
 
+import aiosmtplib
 from fastapi_mail import FastMail, MessageSchema, MessageType, ConnectionConfig
 from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 
 from contacts_api.services.auth import auth_service
-from contacts_api.conf.config import settings
-
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_username,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Desired Name",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+from contacts_api.conf.config import get_settings
+from contacts_api.services.metrics import EMAIL_QUEUE_DEPTH
+
+
+@lru_cache
+def get_mail_config() -> ConnectionConfig:
+    """
+    Returns the SMTP connection configuration, built on first use.
+
+    :return: Connection configuration for FastMail.
+    :rtype: ConnectionConfig
+    """
+    settings = get_settings()
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_username,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME="Desired Name",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    )
+
+
+_sending = 0
+
 
 async def send_email(email: EmailStr, username: str, host: str):
     """
@@ -31,6 +54,9 @@ async def send_email(email: EmailStr, username: str, host: str):
     :raises ConnectionErrors: If there is an issue connecting to the email server.
     """
 
+    global _sending
+    _sending += 1
+    EMAIL_QUEUE_DEPTH.inc()
     try:
         token_verification = auth_service.create_email_token({'sub': email})
         message = MessageSchema(
@@ -40,8 +66,159 @@ async def send_email(email: EmailStr, username: str, host: str):
             subtype=MessageType.html
         )
 
-        fm = FastMail(conf)
+        fm = FastMail(get_mail_config())
         await fm.send_message(message, template_name='email_template.html')
         
     except ConnectionErrors as err:
         raise ConnectionErrors(err)
+    finally:
+        _sending -= 1
+        EMAIL_QUEUE_DEPTH.dec()
+
+
+async def drain(timeout: float) -> int:
+    """
+    Waits until emails that are being sent by background tasks have finished.
+
+    :param timeout: Maximum time to wait in seconds.
+    :return: Number of emails still being sent when the wait ended.
+    """
+    deadline = time.monotonic() + timeout
+    while _sending and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    return _sending
+
+
+class SMTPPool:
+    """
+    Keeps up to ``size`` logged-in SMTP connections open and reuses them.
+
+    ``FastMail.send_message`` connects, logs in and quits for every message, which
+    dominates the cost of bulk mailing; the pool pays for it once per connection.
+    A connection that fails while sending is closed instead of being reused, and a
+    message that hits a connection the server already closed is sent again on a
+    fresh one.
+
+    :param config: SMTP server and credentials.
+    :type config: ConnectionConfig
+    :param size: maximum number of open connections.
+    :type size: int
+    """
+
+    def __init__(self, config: ConnectionConfig, size: int = 4) -> None:
+        self.config = config
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[aiosmtplib.SMTP] = []
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD)
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        """
+        Lends a connection, opening one when none is idle.
+
+        :return: a logged-in connection, returned to the pool when the block succeeds.
+        :rtype: AsyncIterator[aiosmtplib.SMTP]
+        """
+        async with self._slots:
+            smtp = self._idle.pop() if self._idle else await self._connect()
+            try:
+                yield smtp
+            except BaseException:
+                smtp.close()
+                raise
+            self._idle.append(smtp)
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Sends a message on a pooled connection.
+
+        :param message: message built by :func:`render_message`.
+        :type message: EmailMessage
+        :raises aiosmtplib.SMTPException: If the message cannot be sent.
+        """
+        if self.config.SUPPRESS_SEND:
+            return
+        try:
+            async with self.connection() as smtp:
+                await smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            async with self.connection() as smtp:
+                await smtp.send_message(message)
+
+    async def close(self) -> None:
+        """
+        Closes the idle connections.
+        """
+        idle, self._idle = self._idle, []
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+
+def render_message(message: MessageSchema, template_name: str) -> EmailMessage:
+    """
+    Builds a message from a template of the templates folder, for sending through
+    an :class:`SMTPPool`.
+
+    :param message: recipients, subject and template data.
+    :type message: MessageSchema
+    :param template_name: file in the templates folder.
+    :type template_name: str
+    :return: message ready to be sent.
+    :rtype: EmailMessage
+    """
+    config = get_mail_config()
+    body = config.template_engine().get_template(template_name).render(**message.template_body)
+    mail = EmailMessage()
+    mail['Subject'] = message.subject
+    mail['From'] = formataddr((config.MAIL_FROM_NAME, config.MAIL_FROM)) if config.MAIL_FROM_NAME else config.MAIL_FROM
+    mail['To'] = ', '.join(message.recipients)
+    if message.cc:
+        mail['Cc'] = ', '.join(message.cc)
+    if message.bcc:
+        # aiosmtplib delivers to Bcc recipients and strips the header before sending.
+        mail['Bcc'] = ', '.join(message.bcc)
+    if message.reply_to:
+        mail['Reply-To'] = ', '.join(message.reply_to)
+    mail['Date'] = formatdate(localtime=True)
+    mail['Message-ID'] = make_msgid()
+    mail.set_content(body, subtype='html' if message.subtype == MessageType.html else 'plain')
+    return mail
+
+
+async def send_birthday_digest(pool: SMTPPool, email: EmailStr, username: str, birthdays: List[dict],
+                               days: int) -> None:
+    """
+    Sends a user the list of their contacts' upcoming birthdays.
+
+    :param pool: SMTP connections to send through.
+    :type pool: SMTPPool
+    :param email: Email address of the recipient.
+    :param username: Username of the recipient.
+    :param birthdays: ``name`` and ``date`` of every birthday, soonest first.
+    :type birthdays: List[dict]
+    :param days: Number of days the digest covers.
+    :type days: int
+    """
+    message = MessageSchema(
+        subject=f'Upcoming birthdays in the next {days} days',
+        recipients=[email],
+        template_body={'username': username, 'birthdays': birthdays, 'days': days},
+        subtype=MessageType.html
+    )
+    await pool.send(render_message(message, 'birthday_digest.html'))
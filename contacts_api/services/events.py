@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Set
+
+from redis.exceptions import RedisError
+
+from contacts_api.database.models import Contact
+from contacts_api.schemas import ContactInDB
+from contacts_api.services.metrics import EVENTS_PUBLISHED, EVENTS_DROPPED, EVENT_SUBSCRIBERS
+from contacts_api.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'contacts:events:'
+
+# Sent to a subscriber that fell too far behind; the client resynchronizes with
+# GET /api/contacts/changes instead of receiving the events it missed.
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """
+    Events of one user delivered to one client connection.
+
+    The queue is bounded: a client that does not keep up is marked as overflowed
+    and receives a single ``resync`` event instead of unbounded buffering.
+
+    :param user_id: owner of the contacts.
+    :type user_id: int
+    :param max_queued: events buffered before the client is told to resync.
+    :type max_queued: int
+    """
+
+    def __init__(self, user_id: int, max_queued: int) -> None:
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.overflowed = False
+
+    def deliver(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            EVENTS_DROPPED.inc()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class EventHub:
+    """
+    Fans contact change events from Redis pub/sub out to the clients of one worker.
+
+    Every worker holds a single pattern subscription for all users, so the number
+    of Redis connections does not grow with the number of clients; events are
+    routed to local subscribers with a dictionary lookup. Events are published
+    without waiting for Redis, so a slow or unavailable Redis never delays writes.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._listener: asyncio.Task | None = None
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+
+    async def start(self) -> None:
+        """
+        Subscribes to the event channels and starts dispatching; called from the lifespan.
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Stops dispatching and waits for events still being published.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _listen(self) -> None:
+        backoff = 0.1
+        while True:
+            pubsub = get_redis('events').pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + '*')
+                backoff = 0.1
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    try:
+                        self._dispatch(message['channel'], message['data'])
+                    except ValueError as e:
+                        # A bad payload or channel name is dropped; the subscription stays up.
+                        logger.warning('Skipping malformed contact event on %s: %s', message['channel'], e)
+            except RedisError as e:
+                logger.warning('Contact events subscription lost, retrying in %.1fs: %s', backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5)
+            finally:
+                await pubsub.aclose()
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        subscriptions = self._subscriptions.get(int(channel[len(CHANNEL_PREFIX):]))
+        if not subscriptions:
+            return
+        event = json.loads(data)
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int, max_queued: int = 100) -> AsyncIterator[Subscription]:
+        """
+        Registers a client for the events of a user for the duration of the block.
+
+        :param user_id: owner of the contacts.
+        :type user_id: int
+        :param max_queued: events buffered before the client is told to resync.
+        :type max_queued: int
+        :return: the client's subscription.
+        :rtype: AsyncIterator[Subscription]
+        """
+        subscription = Subscription(user_id, max_queued)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        try:
+            yield subscription
+        finally:
+            EVENT_SUBSCRIBERS.dec()
+            subscriptions = self._subscriptions[user_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[user_id]
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """
+        Publishes an event to every worker without waiting for Redis.
+
+        Does nothing when the hub is not running (scripts, tests), so writes
+        outside the served application have no side effects.
+
+        :param user_id: owner of the contact.
+        :type user_id: int
+        :param event: JSON-serializable event.
+        :type event: dict
+        """
+        if not self.running:
+            return
+        task = asyncio.create_task(self._publish(user_id, json.dumps(event)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, user_id: int, data: str) -> None:
+        try:
+            await get_redis('events').publish(f'{CHANNEL_PREFIX}{user_id}', data)
+            EVENTS_PUBLISHED.inc()
+        except RedisError as e:
+            logger.warning('Could not publish contact event for user %s: %s', user_id, e)
+
+
+hub = EventHub()
+
+
+def publish_contact_change(user_id: int, change: str, contact: Contact | ContactInDB) -> None:
+    """
+    Publishes the creation, update or deletion of a contact to the user's other devices.
+
+    :param user_id: owner of the contact.
+    :type user_id: int
+    :param change: ``'created'``, ``'updated'`` or ``'deleted'``.
+    :type change: str
+    :param contact: the contact; only its id is sent for deletions.
+    :type contact: Contact | ContactInDB
+    """
+    if not hub.running:
+        return
+    event = {'type': change, 'id': contact.id}
+    if change != 'deleted':
+        event['contact'] = ContactInDB.model_validate(contact, from_attributes=True).model_dump(mode='json')
+    hub.publish(user_id, event)
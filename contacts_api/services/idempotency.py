@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, Coroutine, Any
+
+from fastapi.routing import APIRoute
+from jose import JWTError, jwt
+from redis.exceptions import RedisError
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services.metrics import IDEMPOTENT_REQUESTS
+from contacts_api.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MUTATING_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+KEY_PREFIX = 'idempotency:'
+MAX_KEY_LENGTH = 255
+
+
+def _owner(request: Request) -> str | None:
+    # Keys are scoped to the user; the token is only decoded here, the endpoint
+    # still authenticates the request as usual.
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    settings = get_settings()
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]).get('sub')
+    except JWTError:
+        return None
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256(f'{request.method} {request.url.path}?{request.url.query}\n'.encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _replay(record: dict) -> Response:
+    response = Response(content=record['body'].encode('latin-1'), status_code=record['status'])
+    response.raw_headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in record['headers']]
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+class IdempotentRoute(APIRoute):
+    """
+    Route that honours the ``Idempotency-Key`` header on mutating requests.
+
+    The first request with a key claims it in Redis (``SET NX``) and runs; its
+    response is stored for ``idempotency_ttl`` seconds. A retry with the same key
+    gets the stored response back, with an ``Idempotent-Replayed: true`` header,
+    without running the endpoint again. A duplicate arriving while the first
+    request still runs waits for its response, up to ``idempotency_wait_timeout``
+    seconds, and then gets 409. Reusing a key for a different request gets 422.
+
+    Keys are scoped to the user of the bearer token. Server errors are not
+    stored, so the request can be retried. When Redis is unavailable requests
+    run without idempotency rather than failing.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if not self.methods & MUTATING_METHODS:
+            return handler
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(HEADER)
+            owner = _owner(request) if key else None
+            if owner is None:
+                return await handler(request)
+            if len(key) > MAX_KEY_LENGTH:
+                return JSONResponse(status_code=400, content={'detail': f'{HEADER} is too long'})
+            redis_key = f'{KEY_PREFIX}{owner}:{key}'
+            fingerprint = _fingerprint(request, await request.body())
+            settings = get_settings()
+            redis = get_redis('idempotency')
+            try:
+                claimed = await redis.set(redis_key, json.dumps({'fingerprint': fingerprint}), nx=True,
+                                          ex=settings.idempotency_lock_seconds)
+            except RedisError as e:
+                logger.warning('Idempotency key not checked: %s', e)
+                return await handler(request)
+            if not claimed:
+                return await self._wait_for_first(redis, redis_key, fingerprint, settings.idempotency_wait_timeout)
+
+            IDEMPOTENT_REQUESTS.labels('first').inc()
+            try:
+                response = await handler(request)
+            except BaseException:
+                await self._release(redis, redis_key)
+                raise
+            if response.status_code >= 500 or not hasattr(response, 'body'):
+                await self._release(redis, redis_key)
+                return response
+            record = {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'headers': [(name.decode('latin-1'), value.decode('latin-1')) for name, value in response.raw_headers],
+                'body': response.body.decode('latin-1'),
+            }
+            try:
+                await redis.set(redis_key, json.dumps(record), ex=settings.idempotency_ttl)
+            except RedisError as e:
+                logger.warning('Response for idempotency key not stored: %s', e)
+            return response
+
+        return idempotent_handler
+
+    @staticmethod
+    async def _wait_for_first(redis, redis_key: str, fingerprint: str, timeout: float) -> Response:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                stored = await redis.get(redis_key)
+            except RedisError as e:
+                logger.warning('Idempotency key not checked: %s', e)
+                stored = None
+            if stored is None:
+                # The first request failed or its claim expired; the client may retry.
+                break
+            record = json.loads(stored)
+            if record['fingerprint'] != fingerprint:
+                IDEMPOTENT_REQUESTS.labels('mismatch').inc()
+                return JSONResponse(status_code=422,
+                                    content={'detail': f'{HEADER} was already used for a different request'})
+            if 'status' in record:
+                IDEMPOTENT_REQUESTS.labels('replayed').inc()
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+        IDEMPOTENT_REQUESTS.labels('in_progress').inc()
+        return JSONResponse(status_code=409, content={'detail': f'A request with this {HEADER} is still in progress'})
+
+    @staticmethod
+    async def _release(redis, redis_key: str) -> None:
+        try:
+            await redis.delete(redis_key)
+        except RedisError as e:
+            logger.warning('Idempotency key not released: %s', e)
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from contacts_api.services.metrics import LOOP_BLOCKS, LOOP_LAG, route_label
+
+logger = logging.getLogger(__name__)
+
+
+class RouteMarkerMiddleware:
+    """
+    ASGI middleware marking the stack of every request, for attributing blocks to routes.
+
+    Used in debug mode only. While a request is served, the frame of this
+    middleware is on the stack of the coroutines serving it, holding the request
+    scope; :class:`LoopMonitor` finds it in the stack of the blocked loop thread.
+    The router stores the matched route in the same scope later, so the route
+    template is known by the time a handler runs.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.app(scope, receive, send)
+
+
+_MARKER_CODE = RouteMarkerMiddleware.__call__.__code__
+
+
+def _request_of(frame: FrameType | None) -> tuple[str, str]:
+    # The route template labels the metric, the actual path goes to the log.
+    while frame is not None:
+        if frame.f_code is _MARKER_CODE:
+            scope = frame.f_locals.get('scope')
+            if scope is not None and scope['type'] == 'http':
+                return f'{scope["method"]} {route_label(scope)}', f'{scope["method"]} {scope["path"]}'
+        frame = frame.f_back
+    return 'background', 'no request'
+
+
+class LoopMonitor:
+    """
+    Measures how late the event loop runs its callbacks and finds what blocks it.
+
+    A sampler task sleeps for ``interval`` seconds at a time and records by how
+    much each wake-up was late in ``contacts_event_loop_lag_seconds``; a loop
+    kept busy by blocking calls (synchronous queries, bcrypt, uploads) wakes
+    up late.
+
+    With ``block_threshold`` set (debug mode), a watchdog thread also pings the
+    loop. When a ping is not answered within ``block_threshold`` seconds, it
+    captures the stack of the loop thread, which shows the blocking call, and
+    logs it with the route of the request being served once the loop is free
+    again.
+
+    :param interval: seconds between lag samples.
+    :type interval: float
+    :param block_threshold: blocking time reported with a stack, or None to disable the watchdog.
+    :type block_threshold: float | None
+    """
+
+    def __init__(self, interval: float = 0.5, block_threshold: float | None = None) -> None:
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._sampler: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    async def start(self) -> None:
+        """
+        Starts sampling, and the watchdog when enabled; called from the lifespan.
+        """
+        if self._sampler is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._sampler = asyncio.create_task(self._sample())
+        if self.block_threshold is not None:
+            self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """
+        Stops sampling and the watchdog.
+        """
+        self._stopping.set()
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(loop.time() - start - self.interval, 0))
+
+    def _watch(self) -> None:
+        answered = threading.Event()
+        while not self._stopping.is_set():
+            answered.clear()
+            try:
+                self._loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                # The loop was closed.
+                return
+            if answered.wait(self.block_threshold):
+                self._stopping.wait(self.block_threshold / 2)
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+            # The stack of a running coroutine continues into the coroutines awaiting it.
+            route, request = _request_of(frame)
+            del frame
+            blocked_since = time.monotonic() - self.block_threshold
+            while not answered.wait(0.5):
+                if self._stopping.is_set():
+                    return
+            LOOP_BLOCKS.labels(route).inc()
+            logger.warning('Event loop blocked for %.3fs while serving %s:\n%s',
+                           time.monotonic() - blocked_since, request, stack)
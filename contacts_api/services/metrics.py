@@ -0,0 +1,296 @@
+import os
+import time
+from contextvars import ContextVar
+from collections import Counter as StatementCounter
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess,
+)
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+REQUEST_LATENCY = Histogram(
+    'contacts_http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route'],
+)
+REQUESTS = Counter(
+    'contacts_http_requests_total',
+    'HTTP responses by route template and status code',
+    ['method', 'route', 'status'],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'contacts_db_queries_per_request',
+    'Number of SQL statements executed while serving one request',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'contacts_db_time_per_request_seconds',
+    'Total SQL execution time spent while serving one request',
+    ['route'],
+)
+DB_QUERY_DURATION = Histogram(
+    'contacts_db_query_duration_seconds',
+    'Duration of single SQL statements',
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    'contacts_db_pool_checked_out',
+    'Database connections currently checked out of the pool',
+    multiprocess_mode='livesum',
+)
+DB_CONNECTION_HOLD = Histogram(
+    'contacts_db_connection_hold_seconds',
+    'Time a database connection stays checked out of the pool',
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0),
+)
+DB_POOL_SIZE = Gauge(
+    'contacts_db_pool_size',
+    'Configured number of persistent connections in the pool',
+    multiprocess_mode='livesum',
+)
+DB_POOL_MAX_OVERFLOW = Gauge(
+    'contacts_db_pool_max_overflow',
+    'Connections the pool may open above its size',
+    multiprocess_mode='livesum',
+)
+REDIS_LATENCY = Histogram(
+    'contacts_redis_command_duration_seconds',
+    'Redis command latency by client and command',
+    ['client', 'command'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0),
+)
+REDIS_ERRORS = Counter(
+    'contacts_redis_command_errors_total',
+    'Redis commands that raised an error',
+    ['client', 'command'],
+)
+REDIS_POOL_WAIT = Histogram(
+    'contacts_redis_pool_wait_seconds',
+    'Time spent waiting for a free connection in the shared Redis pool',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5),
+)
+REDIS_POOL_IN_USE = Gauge(
+    'contacts_redis_pool_in_use',
+    'Connections of the shared Redis pool currently in use',
+    multiprocess_mode='livesum',
+)
+REDIS_DEGRADED = Gauge(
+    'contacts_redis_degraded',
+    'Whether the Redis circuit breaker is open, i.e. Redis is bypassed',
+    multiprocess_mode='livesum',
+)
+REDIS_DEGRADED_SECONDS = Counter(
+    'contacts_redis_degraded_seconds_total',
+    'Time spent with the Redis circuit breaker open or half-open',
+)
+REDIS_BREAKER_TRANSITIONS = Counter(
+    'contacts_redis_breaker_transitions_total',
+    'Redis circuit breaker state changes by new state',
+    ['state'],
+)
+RATE_LIMIT_FALLBACKS = Counter(
+    'contacts_rate_limit_fallbacks_total',
+    'Rate limit checks made by the local in-process limiter because Redis was unavailable',
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    'contacts_admission_in_flight',
+    'Requests being served per route group',
+    ['group'],
+    multiprocess_mode='livesum',
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'contacts_admission_queue_depth',
+    'Requests waiting for a free slot per route group',
+    ['group'],
+    multiprocess_mode='livesum',
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    'contacts_admission_queue_wait_seconds',
+    'Time admitted requests waited for a free slot per route group',
+    ['group'],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0),
+)
+ADMISSION_REJECTED = Counter(
+    'contacts_admission_rejected_total',
+    'Requests shed with 503 per route group, because the queue was full or its deadline passed',
+    ['group', 'reason'],
+)
+LOOP_LAG = Histogram(
+    'contacts_event_loop_lag_seconds',
+    'Delay of the event loop in running a callback that was due',
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0),
+)
+LOOP_BLOCKS = Counter(
+    'contacts_event_loop_blocks_total',
+    'Times the event loop was blocked longer than LOOP_BLOCK_THRESHOLD, by route (debug mode only)',
+    ['route'],
+)
+COALESCED_CALLS = Counter(
+    'contacts_coalesced_calls_total',
+    'Repository reads by single-flight role: leader ran the query, follower shared '
+    'its result, fallback gave up waiting and ran its own',
+    ['function', 'role'],
+)
+IDEMPOTENT_REQUESTS = Counter(
+    'contacts_idempotent_requests_total',
+    'Requests with an Idempotency-Key by outcome: first ran the endpoint, replayed '
+    'returned the stored response, in_progress and mismatch were rejected',
+    ['outcome'],
+)
+ACCOUNT_PURGE_DELETED = Counter(
+    'contacts_account_purge_deleted_total',
+    'Contacts deleted by background account purges',
+)
+EVENT_SUBSCRIBERS = Gauge(
+    'contacts_event_subscribers',
+    'Open server-sent event streams of contact changes',
+    multiprocess_mode='livesum',
+)
+EVENTS_PUBLISHED = Counter(
+    'contacts_events_published_total',
+    'Contact change events published to Redis',
+)
+EVENTS_DROPPED = Counter(
+    'contacts_events_dropped_total',
+    'Event streams that fell behind and were told to resynchronize',
+)
+EMAIL_QUEUE_DEPTH = Gauge(
+    'contacts_email_queue_depth',
+    'Background emails scheduled by requests and not yet delivered',
+    multiprocess_mode='livesum',
+)
+
+
+@dataclass
+class RequestStats:
+    """
+    Per-request counters filled in by the database instrumentation.
+
+    ``statements`` is only populated while SQL debugging is enabled.
+    """
+    queries: int = 0
+    db_time: float = 0.0
+    statements: StatementCounter | None = None
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar('current_request', default=None)
+
+
+def route_label(scope: Scope) -> str:
+    """
+    Returns the route template matched for the request, e.g. ``/api/contacts/{contact_id}``.
+
+    Using templates instead of raw paths keeps label cardinality bounded.
+
+    :param scope: ASGI scope after routing.
+    :type scope: Scope
+    :return: route template or ``'unmatched'``.
+    :rtype: str
+    """
+    route = scope.get('route')
+    # ``path_format`` leaves out parameter convertors such as ``:int``.
+    return getattr(route, 'path_format', None) or getattr(route, 'path', None) or 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status codes and SQL cost of every HTTP request.
+
+    Implemented as a plain ASGI app rather than ``BaseHTTPMiddleware`` so that it adds
+    no extra task or response copying per request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = route_label(scope)
+            method = scope['method']
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.db_time)
+            current_request.reset(token)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    ``redis.asyncio.Redis`` client that records the latency and errors of every command.
+
+    :param metrics_label: value of the ``client`` label, e.g. ``'limiter'``.
+    :type metrics_label: str
+    """
+
+    def __init__(self, *args, metrics_label: str = 'default', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_label = metrics_label
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper() if args else 'UNKNOWN'
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except redis.RedisError:
+            REDIS_ERRORS.labels(self.metrics_label, command).inc()
+            raise
+        finally:
+            REDIS_LATENCY.labels(self.metrics_label, command).observe(time.perf_counter() - start)
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    ``BlockingConnectionPool`` that records how long callers wait for a connection
+    and how many connections are in use.
+    """
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - start)
+        REDIS_POOL_IN_USE.inc()
+        return connection
+
+    async def release(self, connection):
+        await super().release(connection)
+        REDIS_POOL_IN_USE.dec()
+
+
+def metrics_response() -> Response:
+    """
+    Renders all registered metrics in the Prometheus text exposition format.
+
+    When ``PROMETHEUS_MULTIPROC_DIR`` is set (multi-worker deployments), the values
+    of all workers are aggregated, so any worker can answer the scrape.
+
+    :return: response for the ``/metrics`` endpoint.
+    :rtype: Response
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
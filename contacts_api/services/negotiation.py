@@ -0,0 +1,104 @@
+from typing import Any, Callable, Coroutine
+
+import msgpack
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class MsgPackResponse(Response):
+    media_type = 'application/msgpack'
+
+    def render(self, content: Any) -> bytes:
+        # ``content`` is already JSON-compatible: FastAPI serializes the response
+        # model before handing it to the response class.
+        return msgpack.packb(content, use_bin_type=True)
+
+
+class MsgPackRequest(Request):
+    """
+    Request whose body is MessagePack; FastAPI parses bodies with :meth:`json`.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, '_json'):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+
+def _quality(accept: str, media_types: tuple) -> float:
+    quality = 0.0
+    for item in accept.split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        if media_type.lower() not in media_types:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality = max(quality, q)
+    return quality
+
+
+def wants_msgpack(accept: str | None) -> bool:
+    """
+    Whether an ``Accept`` header prefers MessagePack to JSON.
+
+    MessagePack is chosen when it is listed explicitly with a quality at least as
+    high as ``application/json``; wildcards keep the JSON default.
+
+    :param accept: value of the ``Accept`` header.
+    :type accept: str | None
+    :rtype: bool
+    """
+    if not accept:
+        return False
+    msgpack_quality = _quality(accept, MSGPACK_TYPES)
+    return msgpack_quality > 0 and msgpack_quality >= _quality(accept, ('application/json',))
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    return content_type is not None and content_type.split(';')[0].strip().lower() in MSGPACK_TYPES
+
+
+class MsgPackRoute(APIRoute):
+    """
+    Route that speaks MessagePack as well as JSON.
+
+    Request bodies sent with ``Content-Type: application/msgpack`` are decoded
+    with MessagePack and validated against the same schemas as JSON bodies.
+    Responses are encoded with MessagePack when the ``Accept`` header asks for
+    it; JSON stays the default. Errors raised as exceptions are still reported
+    as JSON by the application's exception handlers.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        json_handler = super().get_route_handler()
+        response_class = self.response_class
+        self.response_class = MsgPackResponse
+        try:
+            msgpack_handler = super().get_route_handler()
+        finally:
+            self.response_class = response_class
+
+        async def negotiating_handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get('content-type')):
+                # Without a content type FastAPI hands the body to ``json()``.
+                body = await request.body()
+                headers = [(name, value) for name, value in request.scope['headers'] if name != b'content-type']
+                request = MsgPackRequest(dict(request.scope, headers=headers), request.receive)
+                request._body = body
+            if wants_msgpack(request.headers.get('accept')):
+                response = await msgpack_handler(request)
+            else:
+                response = await json_handler(request)
+            response.headers.append('Vary', 'Accept')
+            return response
+
+        return negotiating_handler
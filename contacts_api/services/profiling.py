@@ -0,0 +1,108 @@
+import asyncio
+import hmac
+import logging
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from pyinstrument import Profiler
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.responses import HTMLResponse
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from contacts_api.services.metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_QUERY = 'profile'
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling single requests on demand with a sampling profiler.
+
+    A request is profiled only when it carries the admin token in the ``X-Profile``
+    header or the ``profile`` query parameter. The profiler runs in async mode, so
+    only the profiled request's own task is sampled; other requests served by the
+    worker meanwhile are not recorded. At most one request per worker is profiled
+    at a time, further flagged requests are served normally.
+
+    With ``X-Profile-Output: html`` (or ``profile_output=html``) the call tree is
+    returned instead of the normal response; otherwise the report is stored in
+    ``output_dir`` and its file name returned in the ``X-Profile-File`` header.
+
+    :param token: admin token that enables profiling for a request.
+    :type token: str
+    :param output_dir: directory where HTML reports are stored.
+    :type output_dir: str
+    :param interval: sampling interval in seconds.
+    :type interval: float
+    """
+
+    def __init__(self, app: ASGIApp, token: str, output_dir: str = 'profiles', interval: float = 0.001) -> None:
+        self.app = app
+        self.token = token.encode()
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self._lock = asyncio.Lock()
+
+    def _requested(self, scope: Scope) -> tuple[bool, bool]:
+        headers = dict(scope['headers'])
+        query = parse_qs(scope.get('query_string', b'').decode())
+        supplied = headers.get(PROFILE_HEADER.encode()) or query.get(PROFILE_QUERY, [''])[0].encode()
+        if not supplied or not hmac.compare_digest(supplied, self.token):
+            return False, False
+        inline = (headers.get(b'x-profile-output', b'').decode() == 'html'
+                  or query.get('profile_output', [''])[0] == 'html')
+        return True, inline
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not self.token:
+            await self.app(scope, receive, send)
+            return
+        requested, inline = self._requested(scope)
+        if not requested or self._lock.locked():
+            await self.app(scope, receive, send)
+            return
+
+        async with self._lock:
+            if inline:
+                await self._profile_inline(scope, receive, send)
+            else:
+                await self._profile_to_file(scope, receive, send)
+
+    async def _profile_inline(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def discard(message: Message) -> None:
+            pass
+
+        profiler = Profiler(interval=self.interval, async_mode='enabled')
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        html = await run_in_threadpool(profiler.output_html)
+        await HTMLResponse(html)(scope, receive, send)
+
+    async def _profile_to_file(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{scope["method"]}{scope["path"].replace("/", "_")}.html'
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).append('X-Profile-File', name)
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode='enabled')
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            await run_in_threadpool(self._store, profiler, name)
+            logger.info('Stored profile of %s %s in %s', scope['method'], route_label(scope), name)
+
+    def _store(self, profiler: Profiler, name: str) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        (self.output_dir / name).write_text(profiler.output_html())
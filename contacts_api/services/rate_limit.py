@@ -0,0 +1,214 @@
+import logging
+import time
+from typing import Dict, Tuple
+
+from fastapi_limiter import FastAPILimiter, default_identifier, http_default_callback, ws_default_callback
+from fastapi_limiter.depends import RateLimiter
+from redis.exceptions import NoScriptError, RedisError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from contacts_api.services.metrics import RATE_LIMIT_FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIX = 'fastapi-limiter'
+
+
+class LocalRateLimits:
+    """
+    In-process fixed-window counters, used while Redis is unavailable.
+
+    They follow the same rules as the Redis scripts, but count only the requests
+    of this worker, so with several workers a client may get up to one budget
+    per worker while Redis is down.
+
+    :param max_keys: counters kept before expired windows are swept.
+    :type max_keys: int
+    """
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        self._windows: Dict[str, Tuple[int, float]] = {}
+
+    def hit(self, key: str, times: int, milliseconds: int, weight: int = 1) -> int:
+        """
+        Counts a request in the window of ``key``.
+
+        :param key: rate limit key.
+        :type key: str
+        :param times: requests allowed per window.
+        :type times: int
+        :param milliseconds: window length.
+        :type milliseconds: int
+        :param weight: how many requests this request counts as.
+        :type weight: int
+        :return: milliseconds until the window ends if the limit is exceeded, else 0.
+        :rtype: int
+        """
+        now = time.monotonic()
+        current, ends_at = self._windows.get(key, (0, 0.0))
+        if ends_at > now:
+            if current + weight > times:
+                return max(int((ends_at - now) * 1000), 1)
+            self._windows[key] = (current + weight, ends_at)
+            return 0
+        if weight > times:
+            return milliseconds
+        if len(self._windows) >= self.max_keys:
+            self._windows = {k: v for k, v in self._windows.items() if v[1] > now}
+        self._windows[key] = (weight, now + milliseconds / 1000)
+        return 0
+
+    def clear(self) -> None:
+        self._windows.clear()
+
+
+local_limits = LocalRateLimits()
+
+
+async def init_limiter(redis, prefix: str = DEFAULT_PREFIX) -> None:
+    """
+    Configures ``FastAPILimiter`` with a Redis client whether or not Redis answers.
+
+    ``FastAPILimiter.init`` loads the Lua script and fails when Redis is down; here
+    the client, prefix, identifier and callbacks are always set, and the script
+    is loaded by the first check once Redis is back.
+
+    :param redis: client the limiter uses.
+    :param prefix: prefix of the rate limit keys.
+    :type prefix: str
+    """
+    FastAPILimiter.redis = redis
+    FastAPILimiter.prefix = prefix
+    FastAPILimiter.identifier = default_identifier
+    FastAPILimiter.http_callback = http_default_callback
+    FastAPILimiter.ws_callback = ws_default_callback
+    FastAPILimiter.lua_sha = None
+    try:
+        FastAPILimiter.lua_sha = await redis.script_load(FastAPILimiter.lua_script)
+    except RedisError as e:
+        logger.warning('Redis unavailable, rate limiting locally until it is back: %s', e)
+
+
+async def close_limiter() -> None:
+    """
+    Closes the limiter's Redis client, if it was configured.
+    """
+    if FastAPILimiter.redis is not None:
+        await FastAPILimiter.close()
+        FastAPILimiter.redis = None
+        FastAPILimiter.lua_sha = None
+
+
+class ResilientRateLimiter(RateLimiter):
+    """
+    ``RateLimiter`` that keeps limiting when Redis is slow or down.
+
+    Checks go to Redis as usual. When Redis fails, times out or its circuit
+    breaker is open, the request is counted by :data:`local_limits` instead, so
+    requests are neither blocked waiting for Redis nor let through unlimited.
+    The Lua script is loaded on first use when Redis was down at startup, and
+    requests are limited locally as long as the limiter has no Redis client.
+    """
+
+    async def __call__(self, request: Request, response: Response):
+        # The key is the one ``RateLimiter`` builds, but a missing Redis client
+        # means limiting locally rather than failing the request.
+        route_index = 0
+        dep_index = 0
+        for i, route in enumerate(request.app.routes):
+            if route.path == request.scope['path'] and request.method in route.methods:
+                route_index = i
+                for j, dependency in enumerate(route.dependencies):
+                    if self is dependency.dependency:
+                        dep_index = j
+                        break
+        identifier = self.identifier or FastAPILimiter.identifier or default_identifier
+        callback = self.callback or FastAPILimiter.http_callback or http_default_callback
+        key = f'{FastAPILimiter.prefix or DEFAULT_PREFIX}:{await identifier(request)}:{route_index}:{dep_index}'
+        pexpire = await self._check(key)
+        if pexpire != 0:
+            return await callback(request, response, pexpire)
+
+    async def _check(self, key: str, weight: int = 1) -> int:
+        if FastAPILimiter.redis is None:
+            return local_limits.hit(key, self.times, self.milliseconds, weight)
+        try:
+            return await self._check_redis(key, weight)
+        except RedisError as e:
+            logger.debug('Rate limiting locally: %s', e)
+            RATE_LIMIT_FALLBACKS.inc()
+            return local_limits.hit(key, self.times, self.milliseconds, weight)
+
+    async def _check_redis(self, key: str, weight: int) -> int:
+        redis = FastAPILimiter.redis
+        if FastAPILimiter.lua_sha is None:
+            FastAPILimiter.lua_sha = await redis.script_load(FastAPILimiter.lua_script)
+        try:
+            return await redis.evalsha(FastAPILimiter.lua_sha, 1, key, str(self.times), str(self.milliseconds))
+        except NoScriptError:
+            FastAPILimiter.lua_sha = await redis.script_load(FastAPILimiter.lua_script)
+            return await redis.evalsha(FastAPILimiter.lua_sha, 1, key, str(self.times), str(self.milliseconds))
+
+
+class WeightedRateLimiter(ResilientRateLimiter):
+    """
+    Rate limiter where one request can count as several.
+
+    Used by endpoints that bundle many operations into one request, so a batch of
+    ``n`` operations uses up the same budget as ``n`` single requests. Unlike
+    ``RateLimiter`` it is not a route dependency: the endpoint calls :meth:`hit`
+    once it knows the weight of the request.
+    """
+
+    lua_script = """local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local expire_time = ARGV[2]
+local weight = tonumber(ARGV[3])
+
+local current = tonumber(redis.call('get', key) or "0")
+if current > 0 then
+    if current + weight > limit then
+        return redis.call("PTTL", key)
+    end
+    redis.call("INCRBY", key, weight)
+    return 0
+end
+if weight > limit then
+    return tonumber(expire_time)
+end
+redis.call("SET", key, weight, "px", expire_time)
+return 0"""
+    lua_sha: str | None = None
+
+    async def _check_redis(self, key: str, weight: int) -> int:
+        redis = FastAPILimiter.redis
+        if WeightedRateLimiter.lua_sha is None:
+            WeightedRateLimiter.lua_sha = await redis.script_load(self.lua_script)
+        try:
+            return await redis.evalsha(WeightedRateLimiter.lua_sha, 1, key,
+                                       str(self.times), str(self.milliseconds), str(weight))
+        except NoScriptError:
+            WeightedRateLimiter.lua_sha = await redis.script_load(self.lua_script)
+            return await redis.evalsha(WeightedRateLimiter.lua_sha, 1, key,
+                                       str(self.times), str(self.milliseconds), str(weight))
+
+    async def hit(self, request: Request, response: Response, weight: int = 1):
+        """
+        Counts a request of the given weight, calling the limiter's callback
+        (429 Too Many Requests by default) when the budget is exhausted.
+
+        :param request: The request being limited.
+        :type request: Request
+        :param response: The response of the request.
+        :type response: Response
+        :param weight: How many single requests this request counts as.
+        :type weight: int
+        """
+        identifier = self.identifier or FastAPILimiter.identifier or default_identifier
+        callback = self.callback or FastAPILimiter.http_callback or http_default_callback
+        key = f'{FastAPILimiter.prefix or DEFAULT_PREFIX}:{await identifier(request)}:weighted'
+        pexpire = await self._check(key, weight)
+        if pexpire != 0:
+            return await callback(request, response, pexpire)
@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict
+
+import redis.asyncio as redis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, ResponseError, TimeoutError
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services.circuit_breaker import CircuitBreaker
+from contacts_api.services.metrics import InstrumentedConnectionPool, InstrumentedRedis, REDIS_ERRORS
+
+_pool: InstrumentedConnectionPool | None = None
+_breaker: CircuitBreaker | None = None
+_clients: Dict[str, 'ResilientRedis'] = {}
+
+
+class RedisUnavailableError(ConnectionError):
+    """
+    Raised without contacting Redis while the circuit breaker is open.
+
+    It is a ``ConnectionError``, so code that already falls back on Redis errors
+    falls back immediately instead of waiting for a timeout.
+    """
+
+
+class ResilientRedis(InstrumentedRedis):
+    """
+    Instrumented client whose commands are bounded by a deadline and guarded by a
+    circuit breaker.
+
+    Every command, including the wait for a pooled connection and the retries,
+    fails with ``TimeoutError`` after ``command_timeout`` seconds. Connection
+    errors and timeouts count as failures of the breaker; error replies from a
+    healthy server (``ResponseError``) do not.
+
+    :param breaker: circuit breaker shared by the clients of the pool.
+    :type breaker: CircuitBreaker
+    :param command_timeout: deadline of one command in seconds.
+    :type command_timeout: float
+    """
+
+    def __init__(self, *args, breaker: CircuitBreaker, command_timeout: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+        self.command_timeout = command_timeout
+
+    async def execute_command(self, *args, **options):
+        if not self.breaker.allow():
+            raise RedisUnavailableError('Redis circuit breaker is open')
+        try:
+            result = await asyncio.wait_for(super().execute_command(*args, **options), self.command_timeout)
+        except ResponseError:
+            self.breaker.record_success()
+            raise
+        except asyncio.TimeoutError as e:
+            REDIS_ERRORS.labels(self.metrics_label, str(args[0]).upper() if args else 'UNKNOWN').inc()
+            self.breaker.record_failure()
+            raise TimeoutError(f'Redis command timed out after {self.command_timeout}s') from e
+        except redis.RedisError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+def get_pool() -> InstrumentedConnectionPool:
+    """
+    Returns the application-wide Redis connection pool, creating it on first use.
+
+    The pool is bounded by ``redis_max_connections``; when every connection is busy,
+    callers wait at most ``redis_pool_timeout`` seconds instead of opening more
+    connections. Commands time out after ``redis_socket_timeout`` seconds and are
+    retried ``redis_retries`` times with exponential backoff on connection errors,
+    and idle connections are health-checked every ``redis_health_check_interval``
+    seconds before reuse.
+
+    :return: The shared connection pool.
+    :rtype: InstrumentedConnectionPool
+    """
+    global _pool
+    if _pool is None:
+        settings = get_settings()
+        _pool = InstrumentedConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=0,
+            encoding='utf-8',
+            decode_responses=True,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+            retry=Retry(ExponentialBackoff(cap=0.5, base=0.01), settings.redis_retries),
+            retry_on_error=[ConnectionError, TimeoutError],
+        )
+    return _pool
+
+
+def get_breaker() -> CircuitBreaker:
+    """
+    Returns the circuit breaker guarding the shared Redis pool.
+
+    :return: The breaker; ``degraded`` tells whether Redis is being bypassed.
+    :rtype: CircuitBreaker
+    """
+    global _breaker
+    if _breaker is None:
+        settings = get_settings()
+        _breaker = CircuitBreaker(settings.redis_breaker_failures, settings.redis_breaker_reset_seconds)
+    return _breaker
+
+
+def get_redis(name: str = 'default') -> InstrumentedRedis:
+    """
+    Returns a Redis client backed by the shared connection pool.
+
+    Clients only differ in the ``client`` label their command metrics are recorded
+    under, so every subsystem shares the same connections, limits and circuit
+    breaker: once Redis is found unhealthy, every subsystem bypasses it until it
+    recovers. Commands time out after ``redis_command_timeout`` seconds.
+
+    :param name: Subsystem using the client, e.g. ``'limiter'`` or ``'auth'``.
+    :type name: str
+    :return: Redis client for the subsystem.
+    :rtype: ResilientRedis
+    """
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = ResilientRedis(connection_pool=get_pool(), metrics_label=name,
+                                                 breaker=get_breaker(),
+                                                 command_timeout=get_settings().redis_command_timeout)
+    return client
+
+
+async def close_redis() -> None:
+    """
+    Disconnects the shared pool and forgets the clients and breaker created for it.
+    """
+    global _pool, _breaker
+    _clients.clear()
+    _breaker = None
+    if _pool is not None:
+        await _pool.disconnect()
+        _pool = None
@@ -6,12 +6,12 @@ from sqlalchemy import pool
 from alembic import context
 
 from contacts_api.database.models import Base
-from contacts_api.database.db import SQL_DB_URL
+from contacts_api.conf.config import get_settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", SQL_DB_URL)
+config.set_main_option("sqlalchemy.url", get_settings().sqlalchemy_database_url)
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,28 @@
+"""User contact counter
+
+Revision ID: a5d9c3e8f1b6
+Revises: d8a3f6b2c5e1
+Create Date: 2026-10-19 15:02:47.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d9c3e8f1b6'
+down_revision: Union[str, None] = 'd8a3f6b2c5e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('contact_count', sa.Integer(), server_default='0', nullable=False))
+    # Later drift is corrected by python -m contacts_api.scripts.reconcile_contact_counts.
+    op.execute('UPDATE users SET contact_count = (SELECT count(*) FROM contacts WHERE contacts.user_id = users.id)')
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'contact_count')
@@ -0,0 +1,33 @@
+"""Index contacts by birthday
+
+PostgreSQL only: an expression index matching the ``month * 100 + day`` filter of
+the birthday digest job, so it reads only the contacts with upcoming birthdays.
+
+Revision ID: b7e2d4f9a1c3
+Revises: a5d9c3e8f1b6
+Create Date: 2026-10-19 16:21:05.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d4f9a1c3'
+down_revision: Union[str, None] = 'a5d9c3e8f1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE INDEX ix_contacts_birthday ON contacts '
+               '((EXTRACT(month FROM birth_date) * 100 + EXTRACT(day FROM birth_date)), user_id, id)')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX ix_contacts_birthday')
@@ -0,0 +1,41 @@
+"""Account deletions
+
+Revision ID: c3f8a1d6e9b2
+Revises: b7e2d4f9a1c3
+Create Date: 2026-10-19 17:04:38.270519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e9b2'
+down_revision: Union[str, None] = 'b7e2d4f9a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('disabled', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_table(
+        'account_deletions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('contacts_total', sa.Integer(), nullable=False),
+        sa.Column('contacts_deleted', sa.Integer(), nullable=False),
+        sa.Column('requested_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_account_deletions_user_id'), 'account_deletions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_account_deletions_user_id'), table_name='account_deletions')
+    op.drop_table('account_deletions')
+    op.drop_column('users', 'disabled')
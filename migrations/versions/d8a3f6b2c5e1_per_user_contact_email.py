@@ -0,0 +1,28 @@
+"""Per-user contact email uniqueness
+
+Revision ID: d8a3f6b2c5e1
+Revises: c41d2e7a9f10
+Create Date: 2026-10-19 11:40:07.915322
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f6b2c5e1'
+down_revision: Union[str, None] = 'c41d2e7a9f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_constraint('contacts_email_key', 'contacts', type_='unique')
+    op.create_unique_constraint('uq_contacts_user_id_email', 'contacts', ['user_id', 'email'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_contacts_user_id_email', 'contacts', type_='unique')
+    op.create_unique_constraint('contacts_email_key', 'contacts', ['email'])
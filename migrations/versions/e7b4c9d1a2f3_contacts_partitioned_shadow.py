@@ -0,0 +1,45 @@
+"""Partitioned copy of contacts, kept in sync by a trigger
+
+Opt-in: the base of the ``partitioning`` branch, applied with
+``alembic upgrade partitioning@head`` (or up to this revision, see
+``partition_contacts``); ``alembic upgrade main@head`` leaves contacts alone.
+PostgreSQL only; a no-op on other databases. Fails, creating nothing, while a
+contact has no user_id. The number of hash partitions is taken from
+``alembic -x partitions=N upgrade ...`` or the CONTACTS_PARTITIONS environment
+variable (16 by default). Existing rows are copied afterwards with
+``python -m contacts_api.scripts.partition_contacts``.
+
+Revision ID: e7b4c9d1a2f3
+Revises: 
+Create Date: 2026-10-19 13:05:44.208116
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from contacts_api.database import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b4c9d1a2f3'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = ('partitioning',)
+depends_on: Union[str, Sequence[str], None] = 'c3f8a1d6e9b2'
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    partitions = int(context.get_x_argument(as_dictionary=True).get(
+        'partitions', os.getenv('CONTACTS_PARTITIONS', '16')))
+    for statement in partitioning.create_shadow_table(partitions):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for statement in partitioning.drop_shadow_table():
+        op.execute(statement)
@@ -0,0 +1,43 @@
+"""Replace contacts with its partitioned copy
+
+PostgreSQL only; a no-op on other databases. Rows not yet copied by
+``partition_contacts`` are copied while writes to contacts are blocked, so the
+revision fails, before blocking anything, while more rows than
+``alembic -x swap_max_pending=N upgrade ...`` or the CONTACTS_SWAP_MAX_PENDING
+environment variable (10000 by default) are left: run the tool first. The
+previous table is kept as contacts_old.
+
+Revision ID: f2c8e5a7b9d4
+Revises: e7b4c9d1a2f3
+Create Date: 2026-10-19 13:06:12.730451
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from contacts_api.database import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8e5a7b9d4'
+down_revision: Union[str, None] = 'e7b4c9d1a2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    max_pending = int(context.get_x_argument(as_dictionary=True).get(
+        'swap_max_pending', os.getenv('CONTACTS_SWAP_MAX_PENDING', str(partitioning.SWAP_MAX_PENDING))))
+    for statement in partitioning.swap(max_pending):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for statement in partitioning.unswap():
+        op.execute(statement)
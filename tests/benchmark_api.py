@@ -0,0 +1,463 @@
+"""
+Reproducible HTTP benchmark for the contacts API.
+
+For every dataset size a fresh database is created and seeded with one heavy
+user owning that many contacts. Every route from ``routes/contacts.py``,
+``routes/auth.py`` and ``routes/users.py`` is then driven in-process at a fixed
+concurrency, with Redis (rate limiter), SMTP and Cloudinary replaced by local
+stand-ins, and latency percentiles plus throughput are written as JSON so runs
+on different commits can be compared.
+
+Usage::
+
+    python tests/benchmark_api.py --sizes 1000 100000 1000000 \\
+        --concurrency 16 --requests 400 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Container, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Stand-in configuration so the app can be imported without a real environment.
+for _name, _value in {
+    'SQLALCHEMY_DATABASE_URL': 'sqlite:///./benchmark.db',
+    'SECRET_KEY': 'benchmark-secret',
+    'ALGORITHM': 'HS256',
+    'MAIL_USERNAME': 'benchmark@example.com',
+    'MAIL_PASSWORD': 'benchmark',
+    'MAIL_FROM': 'benchmark@example.com',
+    'MAIL_PORT': '465',
+    'MAIL_SERVER': 'localhost',
+    'CLOUDINARY_NAME': 'benchmark',
+    'CLOUDINARY_API_KEY': 'benchmark',
+    'CLOUDINARY_API_SECRET': 'benchmark',
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import httpx
+from sqlalchemy import create_engine, insert
+from fastapi_limiter import FastAPILimiter
+
+from contacts_api.conf.config import get_settings
+from contacts_api.main import create_app
+from contacts_api.database import instrumentation
+from contacts_api.database.db import SessionLocal, get_db
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.services.auth import auth_service
+from contacts_api.services.metrics import DB_CONNECTION_HOLD
+from contacts_api.scripts.generate_data import DataGenerator, bulk_insert, CONTACT_COLUMNS
+import contacts_api.routes.auth as routes_auth
+import contacts_api.routes.users as routes_users
+import contacts_api.services.account_deletion as account_deletion
+
+SEED_CHUNK = 10_000
+# Contacts of every account the account deletion scenario deletes.
+LEAVING_CONTACTS = 100
+PASSWORD = 'benchmark-password'
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the Redis client used by ``FastAPILimiter``.
+
+    Scripts are accepted and every ``evalsha`` call reports "not limited", so the
+    limiter dependency still runs on every request without throttling the benchmark.
+    """
+
+    async def script_load(self, script: str) -> str:
+        return 'local'
+
+    async def evalsha(self, sha: str, numkeys: int, *args) -> int:
+        return 0
+
+    async def close(self) -> None:
+        return None
+
+
+class LocalUploader:
+    """
+    Stand-in for ``cloudinary.uploader`` that drains the upload without network I/O.
+    """
+
+    @staticmethod
+    def upload(file, **kwargs) -> dict:
+        file.read()
+        return {'version': 1}
+
+
+async def local_send_email(email: str, username: str, host: str) -> None:
+    """
+    Stand-in for ``services.email.send_email``; builds the token but sends nothing.
+    """
+    auth_service.create_email_token({'sub': email})
+
+
+@dataclass
+class Scenario:
+    """
+    One benchmarked route.
+
+    :param name: name used in the JSON report.
+    :param request: builds ``httpx`` request arguments for ``(worker, iteration)``.
+    :param after: optional hook called with ``(worker, response)``.
+    :param expected: status codes of valid results; other responses are counted
+        as unexpected and fail the run, as their latencies measure an error path.
+    """
+    name: str
+    request: Callable[[int, int], dict]
+    after: Optional[Callable[[int, httpx.Response], None]] = None
+    expected: Container[int] = range(200, 300)
+
+
+@dataclass
+class Dataset:
+    """
+    Identifiers and credentials of a seeded database.
+    """
+    size: int
+    heavy_email: str
+    heavy_token: str
+    contact_ids: List[int]
+    worker_emails: List[str] = field(default_factory=list)
+    refresh_tokens: Dict[int, str] = field(default_factory=dict)
+    unconfirmed_email: str = ''
+    last_names: List[str] = field(default_factory=list)
+    leaving_tokens: List[str] = field(default_factory=list)
+
+
+def git_revision() -> str:
+    """
+    Returns the current git commit, or ``'unknown'`` outside a checkout.
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def connection_hold_totals() -> tuple:
+    """
+    Returns the number of pool checkouts so far and the seconds they were held in total.
+    """
+    samples = {sample.name: sample.value for metric in DB_CONNECTION_HOLD.collect() for sample in metric.samples}
+    return samples['contacts_db_connection_hold_seconds_count'], samples['contacts_db_connection_hold_seconds_sum']
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[rank]
+
+
+async def seed(db_url: str, size: int, workers: int, leaving: int = 0) -> Dataset:
+    """
+    Recreates the schema and seeds it for one benchmark run.
+
+    :param db_url: database the benchmark runs against.
+    :param size: number of contacts owned by the heavy user.
+    :param workers: number of concurrent workers; each gets its own session user.
+    :param leaving: number of accounts with ``LEAVING_CONTACTS`` contacts each, to be deleted.
+    :return: identifiers needed to build requests.
+    """
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    password = auth_service.get_password_hash(PASSWORD)
+    heavy_email = 'heavy@example.com'
+    worker_emails = [f'worker{i}@example.com' for i in range(workers)]
+    heavy_token = await auth_service.create_access_token({'sub': heavy_email}, expires_delta=3600)
+    refresh_tokens = {
+        i: await auth_service.create_refresh_token({'sub': email}, expires_delta=3600)
+        for i, email in enumerate(worker_emails)
+    }
+    leaving_emails = [f'leaving{i}@example.com' for i in range(leaving)]
+    leaving_tokens = [await auth_service.create_access_token({'sub': email}, expires_delta=3600)
+                      for email in leaving_emails]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            # One executemany takes its columns from the first row: every row needs every key.
+            {'username': 'heavy_user', 'email': heavy_email, 'password': password, 'confirmed': True,
+             'refresh_token': None},
+            {'username': 'unconfirmed', 'email': 'unconfirmed@example.com', 'password': password,
+             'confirmed': False, 'refresh_token': None},
+        ] + [
+            {'username': f'worker{i}', 'email': email, 'password': password, 'confirmed': True,
+             'refresh_token': refresh_tokens[i]}
+            for i, email in enumerate(worker_emails)
+        ] + [
+            {'username': f'leaving{i}', 'email': email, 'password': password, 'confirmed': True,
+             'refresh_token': None}
+            for i, email in enumerate(leaving_emails)
+        ])
+        heavy_id = conn.execute(User.__table__.select().where(User.email == heavy_email)).first().id
+        leaving_ids = [row.id for row in conn.execute(
+            User.__table__.select().with_only_columns(User.id).where(User.email.in_(leaving_emails)))]
+
+    generator = DataGenerator(seed=size)
+    bulk_insert(engine, Contact.__table__, CONTACT_COLUMNS,
+                (generator.contact_row(heavy_id) for _ in range(size)), SEED_CHUNK)
+    bulk_insert(engine, Contact.__table__, CONTACT_COLUMNS,
+                (generator.contact_row(user_id) for user_id in leaving_ids for _ in range(LEAVING_CONTACTS)),
+                SEED_CHUNK)
+    with engine.connect() as conn:
+        contact_ids = [row.id for row in conn.execute(
+            Contact.__table__.select().with_only_columns(Contact.id).where(Contact.user_id == heavy_id)
+            .order_by(Contact.id)
+        )]
+        last_names = [row.last_name for row in conn.execute(
+            Contact.__table__.select().with_only_columns(Contact.last_name).where(Contact.user_id == heavy_id)
+            .distinct().order_by(Contact.last_name)
+        )]
+    engine.dispose()
+
+    return Dataset(size=size, heavy_email=heavy_email, heavy_token=heavy_token, contact_ids=contact_ids,
+                   worker_emails=worker_emails, refresh_tokens=refresh_tokens,
+                   unconfirmed_email='unconfirmed@example.com', last_names=last_names,
+                   leaving_tokens=leaving_tokens)
+
+
+def build_scenarios(data: Dataset, run_id: str) -> List[Scenario]:
+    """
+    Builds one scenario per route. Destructive scenarios come last.
+    """
+    auth = {'Authorization': f'Bearer {data.heavy_token}'}
+    ids = data.contact_ids
+    rng = random.Random(0)
+
+    def contact_body(tag: str) -> dict:
+        return {
+            'first_name': 'Bench',
+            'last_name': tag,
+            'email': f'{tag}@bench.example.com',
+            'phone': '+48123456789',
+            'birth_date': '1990-05-17',
+        }
+
+    def refresh_after(worker: int, response: httpx.Response) -> None:
+        if response.status_code == 200:
+            data.refresh_tokens[worker] = response.json()['refresh_token']
+
+    email_token = auth_service.create_email_token({'sub': data.heavy_email})
+    delete_ids = list(reversed(ids))
+
+    return [
+        Scenario('contacts.read_contacts', lambda w, i: {
+            'method': 'GET', 'url': '/api/contacts/',
+            'params': {'skip': rng.randrange(0, max(1, len(ids) - 5)), 'limit': 5}, 'headers': auth}),
+        Scenario('contacts.read_contact', lambda w, i: {
+            'method': 'GET', 'url': f'/api/contacts/{rng.choice(ids)}', 'headers': auth}),
+        Scenario('contacts.read_stats', lambda w, i: {
+            'method': 'GET', 'url': '/api/contacts/stats', 'headers': auth}),
+        Scenario('contacts.read_changes', lambda w, i: {
+            'method': 'GET', 'url': '/api/contacts/changes', 'params': {'limit': 100}, 'headers': auth}),
+        Scenario('contacts.find_contact', lambda w, i: {
+            'method': 'GET', 'url': f'/api/contacts/{rng.choice(data.last_names)}', 'headers': auth}),
+        Scenario('contacts.get_birthdays', lambda w, i: {
+            'method': 'GET', 'url': '/api/contacts/contacts/upcoming_birthdays', 'headers': auth}),
+        Scenario('contacts.create_contact', lambda w, i: {
+            'method': 'POST', 'url': '/api/contacts/', 'headers': auth,
+            'json': contact_body(f'create-{run_id}-{w}-{i}')}),
+        Scenario('contacts.update_contact', lambda w, i: {
+            'method': 'PUT', 'url': f'/api/contacts/{rng.choice(ids)}', 'headers': auth,
+            'json': contact_body(f'update-{run_id}-{w}-{i}')}),
+        # Every other call updates the contact the previous call created.
+        Scenario('contacts.upsert_contact', lambda w, i: {
+            'method': 'PUT', 'url': '/api/contacts/', 'headers': auth,
+            'json': contact_body(f'upsert-{run_id}-{w}-{i // 2}')}),
+        Scenario('contacts.run_batch', lambda w, i: {
+            'method': 'POST', 'url': '/api/contacts/batch', 'headers': auth,
+            'json': {'operations': [{'op': 'read', 'id': rng.choice(ids)} for _ in range(5)] + [
+                {'op': 'update', 'id': rng.choice(ids), 'body': contact_body(f'batch-{run_id}-{w}-{i}-{n}')}
+                for n in range(5)]}}),
+        Scenario('auth.signup', lambda w, i: {
+            'method': 'POST', 'url': '/api/auth/signup',
+            'json': {'username': f'sign{w}x{i}', 'email': f'signup-{run_id}-{w}-{i}@example.com',
+                     'password': PASSWORD[:15]}}),
+        Scenario('auth.login', lambda w, i: {
+            'method': 'POST', 'url': '/api/auth/login',
+            'data': {'username': data.heavy_email, 'password': PASSWORD}}),
+        Scenario('auth.confirmed_email', lambda w, i: {
+            'method': 'GET', 'url': f'/api/auth/confirmed_email/{email_token}'}),
+        Scenario('auth.refresh_token', lambda w, i: {
+            'method': 'GET', 'url': '/api/auth/refresh_token',
+            'headers': {'Authorization': f'Bearer {data.refresh_tokens[w]}'}}, after=refresh_after),
+        Scenario('auth.request_email', lambda w, i: {
+            'method': 'POST', 'url': '/api/auth/request_email', 'json': {'email': data.unconfirmed_email}}),
+        Scenario('users.read_users_me', lambda w, i: {
+            'method': 'GET', 'url': '/api/users/me/', 'headers': auth}),
+        Scenario('users.update_avatar_user', lambda w, i: {
+            'method': 'PATCH', 'url': '/api/users/avatar', 'headers': auth,
+            'files': {'file': ('avatar.png', b'\x89PNG' + b'\0' * 2048, 'image/png')}}),
+        Scenario('contacts.remove_contact', lambda w, i: {
+            'method': 'DELETE', 'url': f'/api/contacts{delete_ids.pop()}', 'headers': auth}),
+        # Measures the request only; the purges run on afterwards as background tasks.
+        Scenario('users.delete_account', lambda w, i: {
+            'method': 'DELETE', 'url': '/api/users/me',
+            'headers': {'Authorization': f'Bearer {data.leaving_tokens.pop()}'}}),
+    ]
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, requests: int) -> dict:
+    """
+    Runs ``requests`` calls of one scenario split across ``concurrency`` workers.
+
+    :return: latency percentiles (ms), throughput (req/s), status code counts, the
+        number of requests shed by admission control and of other unexpected
+        responses, and the mean time a request held a database connection (ms).
+    """
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    shed = 0
+    per_worker = max(1, requests // concurrency)
+
+    async def worker(w: int) -> None:
+        nonlocal shed
+        for i in range(per_worker):
+            kwargs = scenario.request(w, i)
+            started = time.perf_counter()
+            response = await client.request(**kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if response.status_code == 503 and 'Retry-After' in response.headers:
+                shed += 1
+            if scenario.after:
+                scenario.after(w, response)
+
+    checkouts, held = connection_hold_totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    checkouts_after, held_after = connection_hold_totals()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'status_codes': statuses,
+        'shed_responses': shed,
+        'unexpected_responses': sum(count for status, count in statuses.items()
+                                    if int(status) not in scenario.expected) - shed,
+        'db_checkouts': int(checkouts_after - checkouts),
+        'db_hold_ms_per_request': round((held_after - held) * 1000 / len(latencies), 3) if latencies else 0.0,
+    }
+
+
+async def run_size(db_url: str, size: int, concurrency: int, requests: int,
+                   only: Optional[List[str]], admission: bool = False) -> dict:
+    """
+    Seeds a dataset of ``size`` contacts and benchmarks every scenario against it.
+
+    Admission control is off unless ``admission`` is set: its limits are sized for
+    production workers, and requests it sheds would measure the 503 path instead
+    of the route. With it on, shed requests are reported apart and do not fail the run.
+    """
+    data = await seed(db_url, size, concurrency, leaving=max(requests, concurrency))
+
+    # Sessions check connections out on the event loop, so a pool smaller than the
+    # number of concurrent requests blocks the loop instead of queueing them.
+    engine = create_engine(db_url, pool_size=concurrency, max_overflow=concurrency)
+    instrumentation.track_pool(engine)
+    account_deletion.get_engine = lambda: engine
+    app = create_app(get_settings().model_copy(update={'admission_enabled': admission}))
+
+    def bench_get_db():
+        db = SessionLocal(bind=engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_get_db
+    await FastAPILimiter.init(LocalRedis())
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        for scenario in build_scenarios(data, run_id=str(size)):
+            if only and scenario.name not in only:
+                continue
+            results[scenario.name] = await drive(client, scenario, concurrency, requests)
+            print(f'{size:>9} {scenario.name:<28} {results[scenario.name]}', file=sys.stderr)
+            if results[scenario.name]['unexpected_responses']:
+                print(f'{size:>9} {scenario.name:<28} UNEXPECTED STATUS CODES', file=sys.stderr)
+
+    await account_deletion.purger.stop()
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    """
+    Command line entry point; prints the JSON report and optionally writes it to a file.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000],
+                        help='contacts owned by the heavy user, one run per size')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=400, help='requests per route and size')
+    parser.add_argument('--db-url', default='sqlite:///./benchmark.db',
+                        help='database to benchmark against; it is dropped and recreated')
+    parser.add_argument('--only', nargs='*', help='run only these scenario names')
+    parser.add_argument('--admission', action='store_true',
+                        help='keep admission control on; shed requests are reported apart')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    args = parser.parse_args(argv)
+
+    routes_auth.send_email = local_send_email
+    routes_users.cloudinary.uploader = LocalUploader
+
+    report = {
+        'meta': {
+            'commit': git_revision(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'db': args.db_url.split(':', 1)[0],
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'admission': args.admission,
+        },
+        'results': {},
+    }
+    for size in args.sizes:
+        report['results'][str(size)] = asyncio.run(
+            run_size(args.db_url, size, args.concurrency, args.requests, args.only, args.admission)
+        )
+
+    report['failed'] = [f'{size}:{name}' for size, results in report['results'].items()
+                        for name, result in results.items() if result['unexpected_responses']]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    if report['failed']:
+        raise SystemExit(f'Scenarios with unexpected status codes: {", ".join(report["failed"])}')
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Cold import benchmark for the application entry point.
+
+Imports ``contacts_api.main`` (or another module) in fresh interpreters, the way
+a worker boots, and reports the wall time together with the slowest modules from
+``python -X importtime``. The database URL points at a file that must not exist
+afterwards and Redis at a closed port, so any import-time connection shows up as
+a failure rather than as a slow boot.
+
+Usage::
+
+    python tests/benchmark_import.py --runs 5 --budget 3.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENVIRONMENT = {
+    'SECRET_KEY': 'benchmark-secret',
+    'ALGORITHM': 'HS256',
+    'MAIL_USERNAME': 'benchmark@example.com',
+    'MAIL_PASSWORD': 'benchmark',
+    'MAIL_FROM': 'benchmark@example.com',
+    'MAIL_PORT': '465',
+    'MAIL_SERVER': 'localhost',
+    'REDIS_HOST': '127.0.0.1',
+    'REDIS_PORT': '1',
+    'CLOUDINARY_NAME': 'benchmark',
+    'CLOUDINARY_API_KEY': 'benchmark',
+    'CLOUDINARY_API_SECRET': 'benchmark',
+}
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parses ``-X importtime`` output into ``{'module', 'self_us', 'cumulative_us'}`` rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append({'module': module.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+    return rows
+
+
+def measure(module: str, runs: int = 5, top: int = 10) -> dict:
+    """
+    Imports ``module`` in ``runs`` fresh interpreters and summarises the boot time.
+
+    :param module: Module to import.
+    :type module: str
+    :param runs: Number of interpreters to start.
+    :type runs: int
+    :param top: Number of slowest modules to report.
+    :type top: int
+    :return: Wall times in seconds, the slowest modules of the last run, and
+        whether the import created the database file.
+    :rtype: dict
+    """
+    timings = []
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'import.db')
+        env = dict(os.environ, **ENVIRONMENT, SQLALCHEMY_DATABASE_URL=f'sqlite:///{db_file}')
+        for _ in range(runs):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                       cwd=ROOT, env=env, capture_output=True, text=True)
+            timings.append(time.perf_counter() - start)
+            if completed.returncode != 0:
+                raise RuntimeError(f'importing {module} failed:\n{completed.stderr[-2000:]}')
+            rows = parse_importtime(completed.stderr)
+        touched_database = os.path.exists(db_file)
+
+    own = [row for row in rows if row['module'].startswith('contacts_api')]
+    return {
+        'module': module,
+        'runs': runs,
+        'median_s': round(statistics.median(timings), 3),
+        'max_s': round(max(timings), 3),
+        'touched_database': touched_database,
+        'slowest_modules': sorted(own, key=lambda row: row['cumulative_us'], reverse=True)[:top],
+        'slowest_self': sorted(rows, key=lambda row: row['self_us'], reverse=True)[:top],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point; exits with 1 when the median boot time exceeds the budget.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='contacts_api.main', help='module to import')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--budget', type=float, help='maximum median import time in seconds')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    args = parser.parse_args(argv)
+
+    report = measure(args.module, runs=args.runs)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    if report['touched_database']:
+        print('importing created the database file', file=sys.stderr)
+        return 1
+    if args.budget is not None and report['median_s'] > args.budget:
+        print(f'median import time {report["median_s"]}s exceeds the {args.budget}s budget', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+CPU and memory benchmark of the contact list read path, per page of contacts.
+
+Compares, on the same SQLite data, the ORM path (``Contact`` instances in the
+session's identity map, validated into ``ContactInDB``) with the record path
+used by ``get_contacts``, ``find_contact`` and ``get_birthdays`` (column rows
+wrapped in slotted ``ContactRecord`` objects, validated into ``ContactRead``).
+Both are measured up to the JSON body FastAPI would send, and the query alone
+is reported as well.
+
+Usage::
+
+    python tests/benchmark_read_path.py --page-size 1000 --rounds 50
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+from typing import Callable, List, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import RECORD_COLUMNS, _records
+from contacts_api.schemas import ContactInDB, ContactRead
+
+
+def orm_page(db, limit: int) -> list:
+    return db.query(Contact).filter(Contact.user_id == 1).limit(limit).all()
+
+
+def record_page(db, limit: int) -> list:
+    return _records(select(*RECORD_COLUMNS).where(Contact.user_id == 1).limit(limit), db)
+
+
+def measure(session_factory, fetch: Callable, adapter: TypeAdapter, page_size: int, rounds: int) -> dict:
+    """
+    Fetches and serializes ``rounds`` pages in fresh sessions.
+
+    :return: best CPU milliseconds for the query and for query plus serialization,
+        and the memory held by one page and peak memory while fetching it, in KiB.
+    :rtype: dict
+    """
+    fetch_cpu, total_cpu = [], []
+    for _ in range(rounds):
+        db = session_factory()
+        start = time.process_time()
+        page = fetch(db, page_size)
+        fetched = time.process_time()
+        adapter.dump_json(adapter.validate_python(page, from_attributes=True))
+        total_cpu.append(time.process_time() - start)
+        fetch_cpu.append(fetched - start)
+        db.close()
+
+    db = session_factory()
+    gc.collect()
+    tracemalloc.start()
+    page = fetch(db, page_size)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+    assert len(page) == page_size
+    return {
+        'fetch_cpu_ms': round(min(fetch_cpu) * 1000, 2),
+        'total_cpu_ms': round(min(total_cpu) * 1000, 2),
+        'held_kib': round(held / 1024),
+        'peak_kib': round(peak / 1024),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=1_000, help='contacts per page')
+    parser.add_argument('--rounds', type=int, default=50, help='pages fetched per path; the best is reported')
+    args = parser.parse_args(argv)
+
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': 1, 'email': 'owner@example.com', 'password': 'x'}])
+        conn.execute(insert(Contact), [
+            {'first_name': f'First{n}', 'last_name': f'Last{n}', 'email': f'contact{n}@example.com',
+             'phone': f'{n:09d}', 'birth_date': date(1990, 1, 1), 'user_id': 1}
+            for n in range(args.page_size)
+        ])
+    session_factory = sessionmaker(bind=engine)
+
+    report = {
+        'page_size': args.page_size,
+        'orm': measure(session_factory, orm_page, TypeAdapter(List[ContactInDB]), args.page_size, args.rounds),
+        'records': measure(session_factory, record_page, TypeAdapter(List[ContactRead]), args.page_size, args.rounds),
+    }
+    engine.dispose()
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import subprocess
+import unittest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmark_import import measure
+
+# Generous enough for slow CI machines; a regression to connecting at import
+# time (a database or SMTP timeout) blows well past it.
+IMPORT_BUDGET_SECONDS = 5.0
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_main_imports_without_side_effects(self):
+        report = measure('contacts_api.main', runs=3)
+        self.assertFalse(report['touched_database'])
+        self.assertLess(report['median_s'], IMPORT_BUDGET_SECONDS)
+
+    def test_main_imports_without_environment(self):
+        # No settings at all: building the application is left to the first use of ``app``.
+        completed = subprocess.run(
+            [sys.executable, '-c', 'import contacts_api.main, contacts_api.database.models, contacts_api.services.email'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env={}, capture_output=True, text=True,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftests import client, session, user
+
+def test_metrics_endpoint(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'contacts_db_pool_checked_out' in response.text
+
+def test_request_recorded_by_route(client):
+    client.get('/')
+    response = client.get('/api/users/me/')
+    assert response.status_code == 401, response.text
+    client.get('/api/no-such-route')
+    data = client.get('/metrics').text
+    assert 'contacts_http_requests_total{method="GET",route="/",status="200"}' in data
+    assert 'route="/api/users/me/",status="401"' in data
+    assert 'route="unmatched",status="404"' in data
+    assert 'no-such-route' not in data
+
+def test_sql_counted_per_request(client, user):
+    client.post('/api/auth/login', data={'username': user.get('email'), 'password': user.get('password')})
+    data = client.get('/metrics').text
+    assert 'contacts_db_queries_per_request_count{route="/api/auth/login"}' in data
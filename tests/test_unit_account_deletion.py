@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.conf.config import Settings
+from contacts_api.database.models import AccountDeletion, Base, Contact, ContactTombstone, User
+from contacts_api.repository.users import get_account_deletion, request_account_deletion
+from contacts_api.services.account_deletion import AccountPurger, purge_account, unfinished_deletions
+
+
+class TestAccountDeletion(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.user = User(email='owner@example.com', password='x', refresh_token='token', contact_count=5)
+        other = User(email='other@example.com', password='x')
+        self.session.add_all([self.user, other])
+        self.session.flush()
+        for owner in (self.user, other):
+            self.session.add_all([Contact(first_name='Jan', last_name='Nowak', email=f'{i}@example.com', phone='1',
+                                          birth_date=date(1990, 1, 1), user_id=owner.id) for i in range(5)])
+        self.session.add(ContactTombstone(contact_id=1, user_id=self.user.id))
+        self.session.commit()
+        self.settings = patch('contacts_api.services.account_deletion.get_settings',
+                              return_value=Settings(account_purge_batch_size=2, account_purge_pause=0))
+        self.settings.start()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_request_disables_user(self):
+        deletion = await request_account_deletion(self.user, self.session)
+        self.assertTrue(self.user.disabled)
+        self.assertIsNone(self.user.refresh_token)
+        self.assertEqual((deletion.status, deletion.contacts_total), ('pending', 5))
+        self.assertEqual((await request_account_deletion(self.user, self.session)).id, deletion.id)
+        self.assertEqual(unfinished_deletions(self.engine), [deletion.id])
+
+    async def test_purge_deletes_user_and_contacts(self):
+        deletion = await request_account_deletion(self.user, self.session)
+        user_id = self.user.id
+        self.assertTrue(await purge_account(deletion.id, self.engine))
+
+        self.session.expire_all()
+        self.assertIsNone(self.session.get(User, user_id))
+        self.assertEqual(self.session.query(Contact).filter(Contact.user_id == user_id).count(), 0)
+        self.assertEqual(self.session.query(ContactTombstone).count(), 0)
+        self.assertEqual(self.session.query(Contact).count(), 5)
+        done = await get_account_deletion(deletion.id, self.session)
+        self.assertEqual((done.status, done.contacts_deleted), ('done', 5))
+        self.assertIsNotNone(done.finished_at)
+        self.assertEqual(unfinished_deletions(self.engine), [])
+
+    async def test_running_deletion_is_not_claimed_twice(self):
+        deletion = await request_account_deletion(self.user, self.session)
+        self.session.query(AccountDeletion).update({'status': 'running'})
+        self.session.commit()
+        self.assertFalse(await purge_account(deletion.id, self.engine))
+        self.assertEqual(self.session.query(Contact).count(), 10)
+
+    async def test_purger_runs_outside_the_request_and_stops_between_batches(self):
+        deletion = await request_account_deletion(self.user, self.session)
+        purger = AccountPurger()
+        slow = Settings(account_purge_batch_size=2, account_purge_pause=60)
+        with patch('contacts_api.services.account_deletion.get_engine', return_value=self.engine), \
+                patch('contacts_api.services.account_deletion.get_settings', return_value=slow):
+            purger.schedule(deletion.id)
+            self.assertEqual(purger.running, 1)
+            while (await get_account_deletion(deletion.id, self.session)).contacts_deleted == 0:
+                self.session.expire_all()
+                await asyncio.sleep(0.01)
+            await purger.stop()
+        self.assertEqual(purger.running, 0)
+        self.session.expire_all()
+        stopped = await get_account_deletion(deletion.id, self.session)
+        self.assertEqual((stopped.status, stopped.contacts_deleted), ('running', 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+import httpx
+from fastapi import FastAPI
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.services.admission import AdmissionControlMiddleware, Bulkhead, route_group
+
+
+class TestRouteGroup(unittest.TestCase):
+
+    def test_groups(self):
+        self.assertEqual(route_group('POST', '/api/auth/login'), 'auth')
+        self.assertEqual(route_group('GET', '/api/contacts/5'), 'contact_reads')
+        self.assertEqual(route_group('PUT', '/api/contacts/5'), 'contact_writes')
+        self.assertEqual(route_group('PATCH', '/api/users/avatar'), 'uploads')
+        self.assertIsNone(route_group('GET', '/api/contacts/events'))
+        self.assertIsNone(route_group('OPTIONS', '/api/contacts/5'))
+        self.assertIsNone(route_group('GET', '/metrics'))
+
+
+class TestBulkhead(unittest.IsolatedAsyncioTestCase):
+
+    async def test_queue_hands_over_slots_and_sheds_excess(self):
+        bulkhead = Bulkhead('unit', concurrency=1, queue_size=1, queue_timeout=0.05)
+        self.assertIsNone(await bulkhead.acquire())
+        waiting = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0)
+        self.assertEqual(bulkhead.queued, 1)
+        self.assertEqual(await bulkhead.acquire(), 'queue_full')
+
+        bulkhead.release()
+        self.assertIsNone(await waiting)
+        self.assertEqual((bulkhead.active, bulkhead.queued), (1, 0))
+        self.assertEqual(await bulkhead.acquire(), 'timeout')
+        self.assertEqual(bulkhead.queued, 0)
+        bulkhead.release()
+        self.assertEqual(bulkhead.active, 0)
+
+
+class TestAdmissionControlMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def test_busy_group_does_not_starve_others(self):
+        app = FastAPI()
+        release = asyncio.Event()
+
+        @app.post('/api/contacts/')
+        async def slow_write():
+            await release.wait()
+            return {}
+
+        @app.get('/api/contacts/{contact_id}')
+        async def read(contact_id: int):
+            return {'id': contact_id}
+
+        bulkheads = {
+            'contact_writes': Bulkhead('contact_writes', concurrency=1, queue_size=0, queue_timeout=1),
+            'contact_reads': Bulkhead('contact_reads', concurrency=1, queue_size=0, queue_timeout=1),
+        }
+        app.add_middleware(AdmissionControlMiddleware, bulkheads=bulkheads)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            write = asyncio.create_task(client.post('/api/contacts/'))
+            while bulkheads['contact_writes'].active == 0:
+                await asyncio.sleep(0.01)
+
+            shed = await client.post('/api/contacts/')
+            self.assertEqual(shed.status_code, 503)
+            self.assertEqual(shed.headers['Retry-After'], '1')
+            self.assertEqual((await client.get('/api/contacts/1')).status_code, 200)
+
+            release.set()
+            self.assertEqual((await write).status_code, 200)
+        self.assertEqual(bulkheads['contact_writes'].active, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
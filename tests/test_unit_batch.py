@@ -0,0 +1,61 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import run_batch
+from contacts_api.schemas import BatchOperation, BatchRequest
+
+
+def contact_body(email):
+    return {'first_name': 'Jan', 'last_name': 'Nowak', 'email': email, 'phone': '123',
+            'birth_date': date(1990, 1, 1)}
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.user = User(email='owner@example.com', password='x')
+        self.session.add(self.user)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_operations_and_partial_failure(self):
+        existing = Contact(**contact_body('old@example.com'), user_id=self.user.id)
+        self.session.add(existing)
+        self.session.commit()
+        operations = [
+            BatchOperation(op='create', body=contact_body('new@example.com')),
+            BatchOperation(op='create', body=contact_body('old@example.com')),
+            BatchOperation(op='update', id=existing.id, body=contact_body('changed@example.com')),
+            BatchOperation(op='read', id=existing.id),
+            BatchOperation(op='delete', id=999),
+        ]
+        results = await run_batch(operations, self.user, self.session)
+        self.assertEqual([result.status for result in results], [201, 409, 200, 200, 404])
+        self.assertEqual(results[3].contact.email, 'changed@example.com')
+        emails = {contact.email for contact in self.session.query(Contact).all()}
+        self.assertEqual(emails, {'new@example.com', 'changed@example.com'})
+
+    def test_operation_arguments_validated(self):
+        with self.assertRaises(ValueError):
+            BatchOperation(op='update', id=1)
+        with self.assertRaises(ValueError):
+            BatchRequest(operations=[])
+
+
+if __name__ == '__main__':
+    unittest.main()
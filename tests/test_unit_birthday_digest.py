@@ -0,0 +1,61 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import birthday_keys
+from contacts_api.scripts.birthday_digest import run
+
+
+class TestBirthdayDigest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.sent = []
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def add_user(self, email, birthdays, confirmed=True, disabled=False):
+        user = User(email=email, username=email, password='x', confirmed=confirmed, disabled=disabled)
+        self.session.add(user)
+        self.session.flush()
+        for i, birth_date in enumerate(birthdays):
+            self.session.add(Contact(first_name='Jan', last_name=f'Nowak{i}', email=f'{i}@example.com', phone='1',
+                                     birth_date=birth_date, user_id=user.id))
+        self.session.commit()
+
+    async def send(self, pool, email, username, birthdays, days):
+        self.sent.append((email, [birthday['name'] for birthday in birthdays]))
+
+    def test_keys_wrap_around_the_year(self):
+        self.assertEqual(birthday_keys(date(2025, 12, 30), 3), [1230, 1231, 101])
+        self.assertEqual(birthday_keys(date(2025, 2, 27), 2), [227, 228, 229])
+        self.assertEqual(birthday_keys(date(2024, 2, 28), 2), [228, 229])
+
+    async def test_one_digest_per_user_across_pages(self):
+        self.add_user('a@example.com', [date(1990, 1, 3), date(1985, 1, 1), date(1980, 1, 2), date(1970, 6, 1)])
+        self.add_user('b@example.com', [date(1990, 6, 1)])
+        self.add_user('c@example.com', [date(1991, 1, 2)])
+        self.add_user('d@example.com', [date(1992, 1, 1)], confirmed=False)
+        self.add_user('e@example.com', [date(1993, 1, 1)], disabled=True)
+
+        stats = await run(self.session, None, 7, date(2025, 1, 1), batch_size=2, send=self.send)
+
+        self.assertEqual(self.sent, [('a@example.com', ['Jan Nowak1', 'Jan Nowak2', 'Jan Nowak0']),
+                                     ('c@example.com', ['Jan Nowak0'])])
+        self.assertEqual(stats, {'users': 2, 'birthdays': 4, 'failed': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+import redis.asyncio as redis
+from fastapi import Depends, FastAPI
+from fastapi_limiter import FastAPILimiter
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.conf.config import get_settings
+from contacts_api.main import lifespan
+from contacts_api.services import redis_client
+from contacts_api.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from contacts_api.services.metrics import REDIS_DEGRADED_SECONDS
+from contacts_api.services.rate_limit import ResilientRateLimiter, WeightedRateLimiter, local_limits
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_failures_and_probes_once(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+        time.sleep(0.06)
+        before = REDIS_DEGRADED_SECONDS._value.get()
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertFalse(breaker.degraded)
+        self.assertGreater(REDIS_DEGRADED_SECONDS._value.get(), before)
+
+
+class TestStalledRedis(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # Accepts connections and never answers, like a Redis stuck on a slow command.
+        self.server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        settings = get_settings().model_copy(update={
+            'redis_host': '127.0.0.1', 'redis_port': port, 'redis_command_timeout': 0.05,
+            'redis_breaker_failures': 2, 'redis_breaker_reset_seconds': 60,
+        })
+        self.patcher = patch.object(redis_client, 'get_settings', return_value=settings)
+        self.patcher.start()
+        local_limits.clear()
+
+    async def asyncTearDown(self):
+        FastAPILimiter.redis = None
+        FastAPILimiter.lua_sha = None
+        await redis_client.close_redis()
+        self.patcher.stop()
+        self.server.close()
+
+    async def test_commands_time_out_then_fail_fast(self):
+        client = redis_client.get_redis('unit')
+        for _ in range(2):
+            start = time.perf_counter()
+            with self.assertRaises(redis.TimeoutError):
+                await client.get('key')
+            self.assertLess(time.perf_counter() - start, 1)
+        self.assertTrue(redis_client.get_breaker().degraded)
+
+        start = time.perf_counter()
+        with self.assertRaises(redis_client.RedisUnavailableError):
+            await redis_client.get_redis('other').get('key')
+        self.assertLess(time.perf_counter() - start, 0.01)
+
+    async def test_rate_limiter_falls_back_to_local_limits(self):
+        FastAPILimiter.redis = redis_client.get_redis('limiter')
+        limiter = ResilientRateLimiter(times=2, seconds=60)
+        results = [await limiter._check('limiter:client') for _ in range(3)]
+        self.assertEqual(results[:2], [0, 0])
+        self.assertGreater(results[2], 0)
+
+
+class TestStartWithoutRedis(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        settings = get_settings().model_copy(update={
+            'redis_host': '127.0.0.1', 'redis_port': 1, 'redis_retries': 0, 'redis_command_timeout': 0.05,
+        })
+        self.patcher = patch.object(redis_client, 'get_settings', return_value=settings)
+        self.patcher.start()
+        local_limits.clear()
+
+    async def asyncTearDown(self):
+        self.patcher.stop()
+
+    async def test_lifespan_limits_locally_and_shuts_down(self):
+        app = FastAPI()
+
+        @app.get('/limited', dependencies=[Depends(ResilientRateLimiter(times=1, seconds=60))])
+        async def limited():
+            return {}
+
+        async with lifespan(app):
+            self.assertIsNotNone(FastAPILimiter.redis)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                self.assertEqual((await client.get('/limited')).status_code, 200)
+                self.assertEqual((await client.get('/limited')).status_code, 429)
+        self.assertIsNone(FastAPILimiter.redis)
+
+    async def test_limits_locally_without_limiter_client(self):
+        self.assertIsNone(FastAPILimiter.redis)
+        limiter = WeightedRateLimiter(times=3, seconds=60)
+        self.assertEqual(await limiter._check('limiter:weighted', 3), 0)
+        self.assertGreater(await limiter._check('limiter:weighted', 1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from sqlalchemy.orm import Session
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import User
+from contacts_api.repository.contacts import get_contacts
+from contacts_api.services.coalescing import SingleFlight
+
+
+class TestCoalescing(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = MagicMock(spec=Session)
+
+        def slow_all():
+            time.sleep(0.1)
+            return [(1, 'Jan', 'Nowak', 'jan@example.com', '1', None, None)]
+
+        self.session.execute().all.side_effect = slow_all
+
+    async def test_identical_calls_share_one_query(self):
+        user = User(id=1)
+        results = await asyncio.gather(*[get_contacts(0, 5, user, self.session) for _ in range(5)])
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.session.execute().all.call_count, 1)
+
+    async def test_different_users_and_pages_not_shared(self):
+        await asyncio.gather(
+            get_contacts(0, 5, User(id=1), self.session),
+            get_contacts(0, 5, User(id=2), self.session),
+            get_contacts(5, 5, User(id=1), self.session),
+        )
+        self.assertEqual(self.session.execute().all.call_count, 3)
+
+    async def test_follower_falls_back_after_timeout(self):
+        flight = SingleFlight('test')
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.2)
+            return len(calls)
+
+        leader = asyncio.create_task(flight.do('key', call, wait_timeout=1))
+        await asyncio.sleep(0)
+        self.assertEqual(await flight.do('key', call, wait_timeout=0.01), 2)
+        self.assertEqual(await leader, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import create_contact, remove_contact, upsert_contact, run_batch, get_stats
+from contacts_api.schemas import BatchOperation, ContactModel
+from contacts_api.scripts.reconcile_contact_counts import reconcile
+
+
+def contact(email):
+    return ContactModel(first_name='Jan', last_name='Nowak', email=email, phone='123',
+                        birth_date=date.today().replace(day=1, year=1990))
+
+
+class TestContactCounts(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.user = User(email='owner@example.com', password='x')
+        self.session.add(self.user)
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_counter_follows_writes(self):
+        first = await create_contact(contact('a@example.com'), self.user, self.session)
+        await upsert_contact(contact('b@example.com'), self.user, self.session)
+        await upsert_contact(contact('b@example.com'), self.user, self.session)
+        self.assertEqual(self.user.contact_count, 2)
+
+        await run_batch([BatchOperation(op='create', body=contact('c@example.com')),
+                         BatchOperation(op='create', body=contact('a@example.com')),
+                         BatchOperation(op='delete', id=first.id)], self.user, self.session)
+        self.assertEqual(self.user.contact_count, 2)
+
+        second = self.session.query(Contact).filter(Contact.email == 'b@example.com').one()
+        await remove_contact(second.id, self.user, self.session)
+        self.assertEqual(self.user.contact_count, 1)
+        self.assertEqual(self.user.contact_count, self.session.query(Contact).count())
+
+    async def test_stats(self):
+        await create_contact(contact('a@example.com'), self.user, self.session)
+        stats = await get_stats(self.user, self.session)
+        self.assertEqual(stats.total, 1)
+        self.assertEqual(stats.birthdays_this_month, 1)
+
+    def test_reconcile_corrects_drift(self):
+        self.session.add(Contact(**contact('a@example.com').dict(), user_id=self.user.id))
+        self.session.add(User(email='other@example.com', password='x', contact_count=3))
+        self.session.commit()
+        self.assertEqual(reconcile(self.engine, batch_size=1), 2)
+        self.session.expire_all()
+        self.assertEqual([user.contact_count for user in self.session.query(User).order_by(User.id)], [1, 0])
+        self.assertEqual(reconcile(self.engine), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
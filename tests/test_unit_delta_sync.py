@@ -0,0 +1,66 @@
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import get_changes, remove_contact
+
+
+class TestDeltaSync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.user = User(email='owner@example.com', password='x')
+        self.session.add(self.user)
+        self.session.commit()
+        for i in range(5):
+            self.session.add(Contact(first_name='Jan', last_name=f'Nowak{i}', email=f'{i}@example.com',
+                                     phone='123', birth_date=date(1990, 1, 1), user_id=self.user.id))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_full_download_in_pages(self):
+        first = await get_changes(None, 3, self.user, self.session)
+        self.assertTrue(first.has_more)
+        second = await get_changes(first.next_token, 3, self.user, self.session)
+        self.assertFalse(second.has_more)
+        ids = [contact.id for contact in first.changed + second.changed]
+        self.assertEqual(sorted(ids), sorted(set(ids)))
+        self.assertEqual(len(ids), 5)
+
+    async def test_only_changes_since_token(self):
+        token = (await get_changes(None, 100, self.user, self.session)).next_token
+        contact = self.session.query(Contact).filter(Contact.last_name == 'Nowak1').first()
+        contact.phone = '999'
+        self.session.commit()
+        removed = self.session.query(Contact).filter(Contact.last_name == 'Nowak2').first().id
+        await remove_contact(removed, self.user, self.session)
+
+        changes = await get_changes(token, 100, self.user, self.session)
+        self.assertEqual([c.phone for c in changes.changed], ['999'])
+        self.assertEqual(changes.deleted, [removed])
+        self.assertEqual((await get_changes(changes.next_token, 100, self.user, self.session)).changed, [])
+
+    async def test_recent_changes_wait_to_settle(self):
+        changes = await get_changes(None, 100, self.user, self.session, settle_seconds=60)
+        self.assertEqual(changes.changed, [])
+
+    async def test_invalid_token(self):
+        with self.assertRaises(ValueError):
+            await get_changes('not-a-token', 10, self.user, self.session)
+
+
+if __name__ == '__main__':
+    unittest.main()
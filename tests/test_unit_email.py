@@ -0,0 +1,44 @@
+import unittest
+from email.message import EmailMessage
+
+from fastapi_mail import MessageSchema, MessageType
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.services.email import get_mail_config, render_message
+
+
+class TestRenderMessage(unittest.TestCase):
+
+    def render(self, **fields):
+        message = MessageSchema(
+            subject='Upcoming birthdays in the next 7 days',
+            recipients=['jan@example.com'],
+            template_body={'username': 'Jan', 'days': 7,
+                           'birthdays': [{'name': 'Anna Nowak', 'date': '2026-10-21'}]},
+            subtype=MessageType.html,
+            **fields,
+        )
+        return render_message(message, 'birthday_digest.html')
+
+    def test_renders_template_as_html(self):
+        mail = self.render()
+        self.assertIsInstance(mail, EmailMessage)
+        self.assertEqual(mail.get_content_type(), 'text/html')
+        self.assertIn('Anna Nowak', mail.get_content())
+
+    def test_sets_headers(self):
+        mail = self.render(cc=['anna@example.com'])
+        config = get_mail_config()
+        self.assertEqual(mail['Subject'], 'Upcoming birthdays in the next 7 days')
+        self.assertEqual(mail['To'], 'jan@example.com')
+        self.assertEqual(mail['Cc'], 'anna@example.com')
+        self.assertIn(config.MAIL_FROM, mail['From'])
+        self.assertIsNotNone(mail['Date'])
+        self.assertIsNotNone(mail['Message-ID'])
+
+
+if __name__ == '__main__':
+    unittest.main()
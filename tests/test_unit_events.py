@@ -0,0 +1,72 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.services.events import EventHub, CHANNEL_PREFIX, RESYNC
+
+
+class TestEvents(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.hub = EventHub()
+
+    async def test_events_routed_to_the_users_subscribers(self):
+        async with self.hub.subscribe(1) as first, self.hub.subscribe(1) as second, self.hub.subscribe(2) as other:
+            self.hub._dispatch(f'{CHANNEL_PREFIX}1', json.dumps({'type': 'deleted', 'id': 7}))
+            self.assertEqual(first.queue.get_nowait(), {'type': 'deleted', 'id': 7})
+            self.assertEqual(second.queue.get_nowait(), {'type': 'deleted', 'id': 7})
+            self.assertTrue(other.queue.empty())
+        self.assertEqual(self.hub._subscriptions, {})
+
+    async def test_slow_subscriber_told_to_resync(self):
+        async with self.hub.subscribe(1, max_queued=2) as subscription:
+            for i in range(5):
+                self.hub._dispatch(f'{CHANNEL_PREFIX}1', json.dumps({'type': 'updated', 'id': i}))
+            self.assertTrue(subscription.overflowed)
+            self.assertEqual(subscription.queue.get_nowait(), RESYNC)
+            self.assertTrue(subscription.queue.empty())
+
+    async def test_listener_skips_malformed_messages(self):
+        messages = [
+            {'channel': f'{CHANNEL_PREFIX}1', 'data': '{not json'},
+            {'channel': f'{CHANNEL_PREFIX}abc', 'data': json.dumps({'type': 'deleted', 'id': 6})},
+            {'channel': f'{CHANNEL_PREFIX}1', 'data': json.dumps({'type': 'deleted', 'id': 7})},
+        ]
+
+        class PubSub:
+            async def psubscribe(self, pattern):
+                pass
+
+            async def get_message(self, timeout):
+                if messages:
+                    return messages.pop(0)
+                await asyncio.sleep(timeout)
+
+            async def aclose(self):
+                pass
+
+        class Redis:
+            def pubsub(self, ignore_subscribe_messages):
+                return PubSub()
+
+        with patch('contacts_api.services.events.get_redis', return_value=Redis()):
+            async with self.hub.subscribe(1) as subscription:
+                with self.assertLogs('contacts_api.services.events', 'WARNING') as logs:
+                    await self.hub.start()
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=1)
+                await self.hub.stop()
+        self.assertEqual(event, {'type': 'deleted', 'id': 7})
+        self.assertEqual(len(logs.records), 2)
+
+    def test_publish_is_noop_when_not_running(self):
+        self.hub.publish(1, {'type': 'deleted', 'id': 1})
+        self.assertEqual(self.hub._pending, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from sqlalchemy import create_engine, func, select
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.scripts.generate_data import DataGenerator, generate
+
+
+class TestGenerateData(unittest.TestCase):
+
+    def test_contacts_per_user_is_skewed(self):
+        counts = DataGenerator(seed=1).contacts_per_user(users=1000, total=100_000)
+        self.assertEqual(sum(counts), 100_000)
+        top = sorted(counts, reverse=True)[:200]
+        self.assertGreater(sum(top), 50_000)
+
+    def test_rows_are_reproducible_and_unique(self):
+        rows = [DataGenerator(seed=3).contact_row(1) for _ in range(2)]
+        generator = DataGenerator(seed=3)
+        again = [generator.contact_row(1) for _ in range(2)]
+        self.assertEqual(rows[0], again[0])
+        self.assertNotEqual(again[0][2], again[1][2])
+
+    def test_generate(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        result = generate(engine, users=20, contacts=500, seed=2, password_hash='hash', chunk_size=64)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(select(func.count()).select_from(User)).scalar(), 20)
+            self.assertEqual(conn.execute(select(func.count()).select_from(Contact)).scalar(), 500)
+        self.assertEqual(result['contacts'], 500)
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services import idempotency
+from contacts_api.services.idempotency import IdempotentRoute
+
+
+class FakeRedis:
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+class TestIdempotentRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        router = APIRouter(route_class=IdempotentRoute)
+
+        @router.post('/contacts', status_code=201)
+        async def create(body: dict):
+            self.calls += 1
+            if body.get('fail'):
+                raise RuntimeError('database down')
+            return {'id': self.calls, **body}
+
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app, raise_server_exceptions=False)
+        self.redis = FakeRedis()
+        settings = get_settings().model_copy(update={'idempotency_wait_timeout': 0.1})
+        self.patchers = [patch.object(idempotency, 'get_redis', return_value=self.redis),
+                         patch.object(idempotency, 'get_settings', return_value=settings)]
+        for patcher in self.patchers:
+            patcher.start()
+        token = jwt.encode({'sub': 'owner@example.com', 'scope': 'access_token'}, settings.secret_key,
+                           algorithm=settings.algorithm)
+        self.headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'k1'}
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.client.post('/contacts', json={'name': 'Jan'}, headers=self.headers)
+        retry = self.client.post('/contacts', json={'name': 'Jan'}, headers=self.headers)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+
+    def test_key_reused_for_another_request(self):
+        self.client.post('/contacts', json={'name': 'Jan'}, headers=self.headers)
+        response = self.client.post('/contacts', json={'name': 'Anna'}, headers=self.headers)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_request_can_be_retried(self):
+        self.assertEqual(self.client.post('/contacts', json={'fail': True}, headers=self.headers).status_code, 500)
+        self.assertEqual(self.redis.data, {})
+
+    def test_duplicate_of_running_request_gets_conflict(self):
+        self.client.post('/contacts', json={'name': 'Jan'}, headers=self.headers)
+        key, record = next(iter(self.redis.data.items()))
+        self.redis.data[key] = json.dumps({'fingerprint': json.loads(record)['fingerprint']})
+        response = self.client.post('/contacts', json={'name': 'Jan'}, headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.calls, 1)
+
+    def test_requests_without_key_are_not_tracked(self):
+        headers = {'Authorization': self.headers['Authorization']}
+        self.client.post('/contacts', json={'name': 'Jan'}, headers=headers)
+        self.client.post('/contacts', json={'name': 'Jan'}, headers=headers)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.redis.data, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database import instrumentation
+from contacts_api.services.metrics import current_request, RequestStats
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        instrumentation.install(self.engine, debug=True, slow_query_ms=0)
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)'))
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_queries_counted_for_current_request(self):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT * FROM items'))
+                conn.execute(text('SELECT * FROM items WHERE id = 1'))
+        finally:
+            current_request.reset(token)
+        self.assertEqual(stats.queries, 2)
+        self.assertGreater(stats.db_time, 0)
+
+    def test_slow_query_logged_with_plan(self):
+        with self.assertLogs('contacts_api.database.instrumentation', level='WARNING') as logs:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT * FROM items WHERE id = :id'), {'id': 1})
+        self.assertIn('Slow query', logs.output[0])
+        self.assertIn('USING INTEGER PRIMARY KEY', logs.output[0])
+
+    def test_server_timing_and_n_plus_one(self):
+        async def app(scope, receive, send):
+            with self.engine.connect() as conn:
+                for i in range(3):
+                    conn.execute(text('SELECT * FROM items WHERE id = :id'), {'id': i})
+            await PlainTextResponse('ok')(scope, receive, send)
+
+        client = TestClient(instrumentation.QueryDebugMiddleware(app, n_plus_one_threshold=3))
+        with self.assertLogs('contacts_api.database.instrumentation', level='WARNING') as logs:
+            response = client.get('/')
+        self.assertRegex(response.headers['server-timing'], r'^db;dur=[\d.]+;desc="3 queries"$')
+        self.assertTrue(any('Probable N+1' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import time
+import unittest
+
+import httpx
+from fastapi import FastAPI
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.services.loop_monitor import LoopMonitor, RouteMarkerMiddleware
+from contacts_api.services.metrics import LOOP_BLOCKS, LOOP_LAG
+
+
+def hash_password_slowly():
+    time.sleep(0.3)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+
+    async def test_lag_is_sampled(self):
+        monitor = LoopMonitor(interval=0.01)
+        before = LOOP_LAG._sum.get()
+        await monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+        self.assertGreaterEqual(LOOP_LAG._sum.get() - before, 0.05)
+
+    async def test_blocking_call_is_reported_with_route_and_stack(self):
+        app = FastAPI()
+
+        @app.post('/api/auth/login')
+        async def login():
+            hash_password_slowly()
+            return {}
+
+        app.add_middleware(RouteMarkerMiddleware)
+        blocks = LOOP_BLOCKS.labels('POST /api/auth/login')
+        before = blocks._value.get()
+        monitor = LoopMonitor(interval=0.05, block_threshold=0.1)
+        await monitor.start()
+        try:
+            with self.assertLogs('contacts_api.services.loop_monitor', 'WARNING') as logs:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+                    self.assertEqual((await client.post('/api/auth/login')).status_code, 200)
+                await asyncio.sleep(0.6)
+        finally:
+            await monitor.stop()
+        self.assertEqual(blocks._value.get(), before + 1)
+        self.assertIn('POST /api/auth/login', logs.output[0])
+        self.assertIn('hash_password_slowly', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
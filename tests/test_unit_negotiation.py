@@ -0,0 +1,61 @@
+import unittest
+
+import msgpack
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.schemas import ContactModel, ContactInDB
+from contacts_api.services.negotiation import MsgPackRoute, wants_msgpack
+
+CONTACT = {'first_name': 'Jan', 'last_name': 'Nowak', 'email': 'jan@example.com', 'phone': '123',
+           'birth_date': '1990-01-01', 'additional_info': None}
+
+
+class TestMsgPackRoute(unittest.TestCase):
+
+    def setUp(self):
+        router = APIRouter(route_class=MsgPackRoute)
+
+        @router.post('/contacts', response_model=ContactInDB)
+        async def create(body: ContactModel):
+            return ContactInDB(id=1, **body.model_dump())
+
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+
+    def test_msgpack_in_and_out(self):
+        response = self.client.post('/contacts', content=msgpack.packb(CONTACT),
+                                    headers={'Content-Type': 'application/msgpack', 'Accept': 'application/msgpack'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), {'id': 1, **CONTACT})
+
+    def test_json_stays_the_default(self):
+        response = self.client.post('/contacts', content=msgpack.packb(CONTACT),
+                                    headers={'Content-Type': 'application/msgpack'})
+        self.assertEqual(response.json(), {'id': 1, **CONTACT})
+        self.assertEqual(self.client.post('/contacts', json=CONTACT, headers={'Accept': '*/*'}).json()['id'], 1)
+
+    def test_invalid_bodies(self):
+        invalid = self.client.post('/contacts', content=msgpack.packb({**CONTACT, 'email': 'nope'}),
+                                   headers={'Content-Type': 'application/msgpack'})
+        self.assertEqual(invalid.status_code, 422)
+        garbage = self.client.post('/contacts', content=b'\xc1', headers={'Content-Type': 'application/msgpack'})
+        self.assertEqual(garbage.status_code, 400)
+
+    def test_accept_header(self):
+        self.assertTrue(wants_msgpack('application/msgpack'))
+        self.assertTrue(wants_msgpack('application/json;q=0.5, application/x-msgpack'))
+        self.assertFalse(wants_msgpack('application/msgpack;q=0.5, application/json'))
+        self.assertFalse(wants_msgpack('application/msgpack;q=0'))
+        self.assertFalse(wants_msgpack('*/*'))
+        self.assertFalse(wants_msgpack(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database import partitioning
+from contacts_api.database.models import Contact
+
+
+class TestPartitioning(unittest.TestCase):
+
+    def test_columns_match_model(self):
+        self.assertEqual(set(partitioning.COLUMNS), {column.name for column in Contact.__table__.columns})
+
+    def test_shadow_table_has_requested_partitions(self):
+        statements = partitioning.create_shadow_table(4)
+        partitions = [s for s in statements if 'PARTITION OF contacts_partitioned' in s]
+        self.assertEqual(len(partitions), 4)
+        self.assertIn('MODULUS 4, REMAINDER 3', partitions[-1])
+        self.assertTrue(any('PRIMARY KEY (id, user_id)' in s for s in statements))
+        self.assertTrue(any(s.startswith('CREATE TRIGGER contacts_mirror') for s in statements))
+
+    def test_shadow_table_refuses_contacts_without_user(self):
+        statements = partitioning.create_shadow_table(4)
+        self.assertEqual(statements[0], partitioning.check_user_ids())
+        self.assertIn('WHERE user_id IS NULL', statements[0])
+        self.assertIn('RAISE EXCEPTION', statements[0])
+
+    def test_shadow_table_has_every_contacts_index(self):
+        statements = partitioning.create_shadow_table(4)
+        for _, shadow in partitioning.INDEXES:
+            self.assertTrue(any(s.startswith(f'CREATE INDEX {shadow} ON contacts_partitioned') for s in statements))
+
+    def test_swap_restores_canonical_names(self):
+        statements = partitioning.swap()
+        self.assertIn('ALTER TABLE contacts RENAME CONSTRAINT uq_contacts_partitioned_user_id_email '
+                      'TO uq_contacts_user_id_email', statements)
+        self.assertIn('ALTER TABLE contacts_old RENAME CONSTRAINT contacts_pkey TO contacts_old_pkey', statements)
+        self.assertLess(statements.index('DROP TRIGGER IF EXISTS contacts_mirror ON contacts'),
+                        statements.index('ALTER TABLE contacts RENAME TO contacts_old'))
+
+    def test_swap_refuses_before_locking_when_copy_is_behind(self):
+        statements = partitioning.swap(max_pending=500)
+        self.assertEqual(statements[0], partitioning.check_caught_up(500))
+        self.assertEqual(statements[1], 'LOCK TABLE contacts IN EXCLUSIVE MODE')
+        self.assertIn('LIMIT 501) pending) > 500 THEN', statements[0])
+        self.assertIn('RAISE EXCEPTION', statements[0])
+
+    def test_unswap_reverses_swap_renames(self):
+        swapped = partitioning.swap()
+        unswapped = partitioning.unswap()
+        for name, shadow in partitioning.CONSTRAINTS:
+            self.assertIn(f'ALTER TABLE contacts RENAME CONSTRAINT {shadow} TO {name}', swapped)
+            self.assertIn(f'ALTER TABLE contacts RENAME CONSTRAINT {name} TO {shadow}', unswapped)
+
+
+if __name__ == '__main__':
+    unittest.main()
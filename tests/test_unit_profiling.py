@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+
+from starlette.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.services.profiling import ProfilingMiddleware
+
+
+async def app(scope, receive, send):
+    await PlainTextResponse('ok')(scope, receive, send)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = TestClient(ProfilingMiddleware(app, token='secret', output_dir=self.tmp.name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_not_profiled_without_token(self):
+        response = self.client.get('/', headers={'X-Profile': 'wrong'})
+        self.assertEqual(response.text, 'ok')
+        self.assertNotIn('x-profile-file', response.headers)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_profile_stored(self):
+        response = self.client.get('/', headers={'X-Profile': 'secret'})
+        self.assertEqual(response.text, 'ok')
+        self.assertIn(response.headers['x-profile-file'], os.listdir(self.tmp.name))
+
+    def test_profile_inline(self):
+        response = self.client.get('/?profile=secret&profile_output=html')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('text/html'))
+        self.assertNotEqual(response.text, 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
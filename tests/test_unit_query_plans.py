@@ -0,0 +1,183 @@
+"""
+Query plan regression tests for the repository.
+
+A realistic address book population is seeded into SQLite and analyzed, every
+statement a repository function executes is captured, and its plan is read with
+``EXPLAIN QUERY PLAN``. A test fails when a statement reads a table without an
+index, or when a query executes more virtual machine instructions than its
+budget; SQLite has no cost estimates, and the instruction count is the
+deterministic measure of how much work a plan really does.
+
+The birthday digest query of all users is not covered: the index it relies on
+is a PostgreSQL expression index.
+"""
+import random
+import re
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, ContactTombstone, User
+from contacts_api.repository import contacts as repository_contacts
+from contacts_api.repository import users as repository_users
+from contacts_api.schemas import ContactModel
+
+USERS = 40
+CONTACTS_PER_USER = 250
+TOMBSTONES_PER_USER = 20
+# The progress handler is called every STEP instructions.
+STEP = 10
+# Budgets are at least twice the cost measured when the tests were written; merely
+# reading every row of the contacts table costs some 30,000 instructions.
+FULL_SCAN = re.compile(r'^SCAN (contacts|contact_tombstones|users)$')
+
+
+class PlanRecorder:
+    """
+    Records the statements executed through an engine, to read their plans and cost.
+
+    It listens from before the first connection is made: connections only
+    dispatch to the listeners the engine had when they were created.
+    """
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        # StaticPool: this is the connection the sessions use as well.
+        self.raw = engine.raw_connection().driver_connection
+        self.statements = []
+        self.active = False
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    @contextmanager
+    def recording(self):
+        self.statements = []
+        self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not executemany and statement.lstrip().upper().startswith(
+                ('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+            self.statements.append((statement, parameters))
+
+    def plans(self):
+        """
+        Returns ``(statement, plan details)`` for every recorded statement.
+        """
+        return [(statement, [row[3] for row in self.raw.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)])
+                for statement, parameters in self.statements]
+
+    def cost(self, statement: str, parameters) -> int:
+        """
+        Runs a read again and returns the number of instructions it executed.
+        """
+        steps = 0
+
+        def count():
+            nonlocal steps
+            steps += STEP
+            return 0
+
+        self.raw.set_progress_handler(count, STEP)
+        try:
+            self.raw.execute(statement, parameters).fetchall()
+        finally:
+            self.raw.set_progress_handler(None, STEP)
+        return steps
+
+
+class TestQueryPlans(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        cls.recorder = PlanRecorder(cls.engine)
+        Base.metadata.create_all(bind=cls.engine)
+        rng = random.Random(48)
+        now = datetime.utcnow()
+        with cls.engine.begin() as conn:
+            conn.execute(insert(User), [{'id': i, 'email': f'user{i}@example.com', 'password': 'x', 'confirmed': True,
+                                         'contact_count': CONTACTS_PER_USER} for i in range(1, USERS + 1)])
+            conn.execute(insert(Contact), [
+                {'first_name': f'First{n}', 'last_name': f'Last{n}', 'email': f'contact{n}@example.com',
+                 'phone': f'{n:09d}', 'birth_date': date(1950, 1, 1) + timedelta(days=rng.randrange(20_000)),
+                 'user_id': user_id, 'created_at': now - timedelta(minutes=n), 'updated_at': now - timedelta(minutes=n)}
+                for user_id in range(1, USERS + 1) for n in range(CONTACTS_PER_USER)
+            ])
+            conn.execute(insert(ContactTombstone), [
+                {'contact_id': 1_000_000 + n, 'user_id': user_id, 'deleted_at': now - timedelta(minutes=n)}
+                for user_id in range(1, USERS + 1) for n in range(TOMBSTONES_PER_USER)
+            ])
+            conn.exec_driver_sql('ANALYZE')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.dispose()
+
+    def setUp(self):
+        self.session = sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = self.session.get(User, USERS // 2)
+        self.contact_id = self.session.query(Contact.id).filter(Contact.user_id == self.user.id).first()[0]
+
+    def tearDown(self):
+        self.session.rollback()
+        self.session.close()
+
+    async def check(self, call, budget: int):
+        """
+        Runs ``call`` and checks the plans of its statements and the cost of its reads.
+        """
+        with self.recorder.recording() as recorder:
+            await call()
+        self.assertTrue(recorder.statements)
+        for statement, plan in recorder.plans():
+            with self.subTest(statement=statement):
+                scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+                self.assertEqual(scans, [], f'full table scan in plan {plan}')
+        for statement, parameters in recorder.statements:
+            if statement.lstrip().upper().startswith('SELECT'):
+                with self.subTest(statement=statement):
+                    self.assertLessEqual(recorder.cost(statement, parameters), budget)
+
+    async def test_get_contacts(self):
+        await self.check(lambda: repository_contacts.get_contacts(0, 20, self.user, self.session), 800)
+
+    async def test_get_contact(self):
+        await self.check(lambda: repository_contacts.get_contact(self.contact_id, self.user, self.session), 200)
+
+    async def test_find_contact(self):
+        await self.check(lambda: repository_contacts.find_contact('Last12', self.user, self.session), 10_000)
+
+    async def test_get_changes(self):
+        await self.check(lambda: repository_contacts.get_changes(None, 50, self.user, self.session), 12_000)
+
+    async def test_get_birthdays(self):
+        await self.check(lambda: repository_contacts.get_birthdays(self.user, self.session), 4_000)
+
+    async def test_get_stats(self):
+        await self.check(lambda: repository_contacts.get_stats(self.user, self.session), 4_000)
+
+    async def test_upsert_contact(self):
+        body = ContactModel(first_name='Jan', last_name='Nowak', email='contact3@example.com', phone='1',
+                            birth_date=date(1990, 1, 1))
+        await self.check(lambda: repository_contacts.upsert_contact(body, self.user, self.session), 200)
+
+    async def test_remove_contact(self):
+        await self.check(lambda: repository_contacts.remove_contact(self.contact_id, self.user, self.session), 200)
+
+    async def test_get_user_by_email(self):
+        await self.check(lambda: repository_users.get_user_by_email(self.user.email, self.session), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
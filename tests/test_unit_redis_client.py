@@ -0,0 +1,47 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+import redis.asyncio as redis
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.conf.config import get_settings
+from contacts_api.services import redis_client
+from contacts_api.services.metrics import REDIS_ERRORS
+
+
+class TestRedisClient(unittest.TestCase):
+
+    def setUp(self):
+        settings = get_settings().model_copy(update={'redis_host': '127.0.0.1', 'redis_port': 1})
+        self.patcher = patch.object(redis_client, 'get_settings', return_value=settings)
+        self.patcher.start()
+
+    def tearDown(self):
+        asyncio.run(redis_client.close_redis())
+        self.patcher.stop()
+
+    def test_clients_share_one_pool(self):
+        limiter = redis_client.get_redis('limiter')
+        auth = redis_client.get_redis('auth')
+        self.assertIs(limiter, redis_client.get_redis('limiter'))
+        self.assertIsNot(limiter, auth)
+        self.assertIs(limiter.connection_pool, auth.connection_pool)
+        self.assertEqual(limiter.connection_pool.max_connections, get_settings().redis_max_connections)
+
+    def test_unreachable_server_fails_fast_and_is_counted(self):
+        errors = REDIS_ERRORS.labels('unit', 'PING')
+        before = errors._value.get()
+        start = time.perf_counter()
+        with self.assertRaises(redis.ConnectionError):
+            asyncio.run(redis_client.get_redis('unit').ping())
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(errors._value.get(), before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.db import SessionLocal
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository.contacts import get_contacts
+from contacts_api.repository.users import get_user_by_email
+
+
+class TestReleasingSession(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f'sqlite:///{self.tmp.name}/release.db')
+        Base.metadata.create_all(bind=self.engine)
+        self.session = SessionLocal(bind=self.engine)
+        user = User(email='owner@example.com', password='x')
+        self.session.add(user)
+        self.session.flush()
+        self.session.add(Contact(first_name='Jan', last_name='Nowak', email='jan@example.com', phone='1',
+                                 birth_date=date(1990, 1, 1), user_id=user.id))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def test_reads_return_the_connection(self):
+        user = await get_user_by_email('owner@example.com', self.session)
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+        contacts = await get_contacts(0, 5, user, self.session)
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+        # Results stay loaded; reading them does not check a connection out again.
+        self.assertEqual((contacts[0].email, user.contact_count), ('jan@example.com', 0))
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+
+    async def test_pending_changes_are_not_committed(self):
+        user = self.session.query(User).first()
+        user.username = 'changed'
+        self.session.release()
+        self.assertEqual(self.engine.pool.checkedout(), 1)
+        self.session.rollback()
+        self.assertIsNone(self.session.query(User).first().username)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,31 +28,34 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.user = User(id=1)
 
     async def test_get_contacts(self):
-        contacts = [Contact(), Contact(), Contact()]
-        self.session.query().filter().offset().limit().all.return_value = contacts
+        rows = [(i, 'test', 'contact', f'test{i}@example.com', '123456789', datetime(1990, 1, 1).date(), None)
+                for i in range(3)]
+        self.session.execute().all.return_value = rows
         result = await get_contacts(skip=0, limit=10, user=self.user, db=self.session)
-        self.assertEqual(result, contacts)
+        self.assertEqual([contact.id for contact in result], [0, 1, 2])
+        self.assertEqual(result[1].email, 'test1@example.com')
 
     async def test_get_contact_found(self):
-        contact = Contact()
-        self.session.query().filter().first.return_value = contact
+        row = (1, 'test', 'contact', 'test@example.com', '123456789', datetime(1990, 1, 1).date(), None)
+        self.session.execute().all.return_value = [row]
         result = await get_contact(contact_id=1, user=self.user, db=self.session)
-        self.assertEqual(result, contact)
+        self.assertNotIsInstance(result, Contact)
+        self.assertEqual((result.id, result.email), (1, 'test@example.com'))
 
     async def test_get_contact_not_found(self):
-        self.session.query().filter().first.return_value = None
+        self.session.execute().all.return_value = []
         result = await get_contact(contact_id=1, user=self.user, db=self.session)
         self.assertIsNone(result)
 
     async def test_find_contact_found(self):
-        contact = Contact(first_name='test')
-        self.session.query().filter().all.return_value = [contact]
+        row = (1, 'test', 'contact', 'test@example.com', '123456789', datetime(1990, 1, 1).date(), None)
+        self.session.execute().all.return_value = [row]
         result = await find_contact(query='test', user=self.user, db=self.session)
         self.assertIsNotNone(result)
-        self.assertEqual(contact.first_name, result[0].first_name)
+        self.assertEqual(result[0].first_name, 'test')
 
     async def test_find_contact_not_found(self):
-        self.session.query().filter().all.return_value = None
+        self.session.execute().all.return_value = []
         result = await find_contact(query='test', user=self.user, db=self.session)
         self.assertIsNone(result)
 
@@ -143,16 +146,16 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
                             phone='123456789',
                             birth_date=(datetime.today() + timedelta(days=3)).date(),
                             )
-        contact = Contact(**body.dict(), user_id=self.user.id)
-        self.session.query().filter().all.return_value = [contact]
+        row = (1, body.first_name, body.last_name, body.email, body.phone, body.birth_date, None)
+        self.session.execute().all.return_value = [row]
         result = await get_birthdays(user=self.user, db=self.session)
         self.assertIsNotNone(result)
-        self.assertEqual(result, [contact])
+        self.assertEqual([(contact.id, contact.birth_date) for contact in result], [(1, body.birth_date)])
 
     async def test_get_birthdays_not_found(self):
-        self.session.query().filter().all.return_value = None
+        self.session.execute().all.return_value = []
         result = await get_birthdays(user=self.user, db=self.session)
-        self.assertIsNone(result)
+        self.assertEqual(result, [])
 
 if __name__ == '__main__':
     unittest.main()
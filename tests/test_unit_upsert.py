@@ -0,0 +1,66 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contacts_api.database.models import Base, Contact, User
+from contacts_api.repository import contacts as repository_contacts
+from contacts_api.repository.contacts import upsert_contact
+from contacts_api.schemas import ContactModel
+
+
+def contact(phone):
+    return ContactModel(first_name='Jan', last_name='Nowak', email='jan@example.com', phone=phone,
+                        birth_date=date(1990, 1, 1))
+
+
+class TestUpsert(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.owner = User(email='owner@example.com', password='x')
+        self.other = User(email='other@example.com', password='x')
+        self.session.add_all([self.owner, self.other])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    async def test_insert_then_update(self):
+        first, created = await upsert_contact(contact('111'), self.owner, self.session)
+        self.assertTrue(created)
+        second, created = await upsert_contact(contact('222'), self.owner, self.session)
+        self.assertFalse(created)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.phone, '222')
+        self.assertEqual(self.session.query(Contact).count(), 1)
+
+    async def test_same_email_for_different_users(self):
+        mine, _ = await upsert_contact(contact('111'), self.owner, self.session)
+        theirs, created = await upsert_contact(contact('111'), self.other, self.session)
+        self.assertTrue(created)
+        self.assertNotEqual(mine.id, theirs.id)
+
+    async def test_dialect_without_on_conflict_reads_first(self):
+        with patch.dict(repository_contacts.UPSERT_INSERTS, clear=True):
+            first, created = await upsert_contact(contact('111'), self.owner, self.session)
+            self.assertTrue(created)
+            second, created = await upsert_contact(contact('222'), self.owner, self.session)
+        self.assertFalse(created)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.phone, '222')
+        self.assertEqual(self.session.query(Contact).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()